@@ -1,29 +1,36 @@
 import azure.functions as func
 import logging
 import os
-import requests
-import json
-from pymongo import MongoClient
-from datetime import datetime, timezone
+import heapq
+import itertools
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 import numpy as np
+from pymongo import DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
 from shared.model_loader import model_loader
+from shared.db import db_manager
+from shared.cache import LRUCache
+from shared.tiktok_client import TikTokTrendingClient
+from shared.ingest_pipeline import run_ingest_pipeline, JsonlSink
+from shared.stats_history import record_stats_snapshots
+from shared.serializer import dumps_json
+from shared.video_query import build_video_query, fetch_videos_page
+from shared.explain import compute_contributions, format_explanation
+from shared.hashtag_stats import (
+    record_hashtag_stats, get_trending_hashtags, normalize_hashtags, HASHTAG_TRENDING_SORTS,
+    load_hashtag_preimages,
+)
 
 app = func.FunctionApp()
 
 
-# --- 1. KONEKSI DATABASE (Sama seperti sebelumnya) ---
+# --- 1. KONEKSI DATABASE (Shared connection pool per worker) ---
 def get_database():
     try:
-        connection_string = os.environ.get("MONGODB_CONNECTION_STRING")
-        if not connection_string:
-            logging.error("MONGODB_CONNECTION_STRING environment variable not set")
-            raise ValueError("MongoDB connection string not configured")
-        
-        # Log connection attempt without exposing credentials
-        logging.info("Attempting MongoDB connection...")
-        client = MongoClient(connection_string)
-        logging.info("MongoDB connection successful")
-        return client["b4upload_db"]
+        return db_manager.get_database()
     except Exception as e:
         # Log error without exposing connection string or credentials
         error_msg = str(e)
@@ -31,39 +38,39 @@ def get_database():
         if "mongodb" in error_msg.lower():
             error_msg = "MongoDB connection failed - check connection string format"
         logging.error(f"Failed to connect to MongoDB: {error_msg}")
+        # Buang client yang gagal agar request berikutnya reconnect dari awal
+        db_manager.reset()
         raise e
 
 
 # --- 2. FUNGSI FETCH DATA (DISESUAIKAN DENGAN API ANDA) ---
-def fetch_trending_tiktok():
-    # URL dari script JS Anda
-    url = "https://tiktok-api23.p.rapidapi.com/api/post/trending"
+# Jumlah page & item per page untuk setiap run daily fetch
+TIKTOK_FETCH_PAGES = int(os.environ.get("TIKTOK_FETCH_PAGES", "1"))
+TIKTOK_FETCH_COUNT = int(os.environ.get("TIKTOK_FETCH_COUNT", "16"))
 
-    # Parameter sesuai script JS Anda
-    querystring = {"count": "16"}
+_tiktok_client = None
 
-    headers = {
-        "x-rapidapi-key": os.environ.get("RAPIDAPI_KEY"),
-        "x-rapidapi-host": os.environ.get(
-            "RAPIDAPI_HOST"
-        ),  # tiktok-api23.p.rapidapi.com
-    }
 
-    try:
-        response = requests.get(url, headers=headers, params=querystring)
-        response.raise_for_status()
-        data = response.json()
-
-        # Script JS Anda mengecek "itemList"
-        if not data or "itemList" not in data:
-            logging.warning("Response API tidak memiliki 'itemList'")
-            return []
+def get_tiktok_client():
+    """Client trending dibuat sekali per worker agar session HTTP (keep-alive) dipakai ulang"""
+    global _tiktok_client
+    if _tiktok_client is None:
+        _tiktok_client = TikTokTrendingClient()
+    return _tiktok_client
 
-        return data["itemList"]  # Mengembalikan list video
 
+def iter_trending_tiktok_pages(max_pages=None, count=None):
+    """
+    Generator page trending (paginated + concurrent). Setiap page di-yield
+    segera setelah tiba sehingga bisa langsung ditulis ke database.
+    """
+    try:
+        yield from get_tiktok_client().iter_trending_pages(
+            max_pages=max_pages or TIKTOK_FETCH_PAGES,
+            count=count or TIKTOK_FETCH_COUNT,
+        )
     except Exception as e:
         logging.error(f"Error fetching data from tiktok-api23: {e}")
-        return []
 
 
 # --- 3. FUNGSI CLEANING & FORMATTING ---
@@ -86,6 +93,20 @@ def calculate_engagement_rate(stats):
         return "0.00%"
 
 
+def engagement_rate_value(stats):
+    """
+    Engagement rate numerik (likes / views * 100), disimpan di historical_data
+    saat upsert agar ranking bisa memakai index
+    """
+    play_count = stats.get("play_count", 0)
+    digg_count = stats.get("digg_count", 0)
+
+    # Handle division by zero
+    if not play_count:
+        return 0.0
+    return (digg_count / play_count) * 100
+
+
 def format_timestamp(timestamp):
     """
     Format timestamp to readable date-time string
@@ -288,6 +309,7 @@ def process_video_data(raw_item):
         # Description and hashtags
         "description": desc,
         "hashtags": hashtags,
+        "hashtags_lc": normalize_hashtags(hashtags),  # filter /videos?hashtag= (case-insensitive)
         "hashtags_count": len(hashtags),
         "create_time": raw_item.get("createTime"),
         
@@ -310,103 +332,253 @@ def process_video_data(raw_item):
         "fetched_at": datetime.now(),  # Timestamp pengambilan data
     }
 
+    # Engagement rate numerik disimpan saat upsert (dipakai index & ranking top videos)
+    clean_doc["engagement_rate"] = engagement_rate_value(clean_doc["stats"])
+
     return clean_doc
 
 
 # --- 4. UPDATE TOP VIDEOS FUNCTION ---
-def update_top_videos():
+TOP_VIDEOS_LIMIT = 10
+
+# Dokumen dengan stats kosong/invalid tidak ikut ranking
+VALID_STATS_FILTER = {"stats": {"$type": "object", "$ne": {}}}
+
+# Engagement rate (likes / views * 100) dihitung di server MongoDB
+ENGAGEMENT_RATE_EXPR = {
+    "$cond": [
+        {"$gt": [{"$ifNull": ["$stats.play_count", 0]}, 0]},
+        {
+            "$multiply": [
+                {"$divide": [{"$ifNull": ["$stats.digg_count", 0]}, "$stats.play_count"]},
+                100,
+            ]
+        },
+        0.0,
+    ]
+}
+
+
+def select_top_videos_full(historical_collection):
     """
-    Calculate engagement rates for all videos in historical_data,
-    select top 10, and update top_videos collection.
-    
-    This function:
-    1. Queries all videos from historical_data
-    2. Calculates engagement rate for each video
-    3. Sorts by engagement rate descending
-    4. Selects top 10 videos
-    5. Clears top_videos collection
-    6. Inserts top 10 with engagement_rate and last_updated fields
+    Full recompute: hitung ulang engagement_rate semua dokumen di server
+    (tanpa menarik data ke Python), lalu ambil top N lewat index engagement_rate
+    """
+    result = historical_collection.update_many(
+        VALID_STATS_FILTER, [{"$set": {"engagement_rate": ENGAGEMENT_RATE_EXPR}}]
+    )
+    logging.info(f"📊 Recomputed engagement_rate for {result.matched_count} videos")
+    return select_top_videos_indexed(historical_collection)
+
+
+def select_top_videos_indexed(historical_collection):
+    """Ambil top N dari historical_data memakai index engagement_rate_desc"""
+    return list(
+        historical_collection.find(VALID_STATS_FILTER)
+        .sort("engagement_rate", DESCENDING)
+        .limit(TOP_VIDEOS_LIMIT)
+    )
+
+
+def select_top_videos_incremental(db, historical_collection, new_videos):
+    """
+    Merge video yang baru di-fetch dengan top set saat ini (maks N dokumen).
+    Jika video di top set di-update dengan rate lebih rendah, video lain di luar
+    top set bisa naik peringkat - fallback ke query indexed.
+    """
+    current_top = load_top_videos(db)
+    for video in current_top:
+        video.pop("last_updated", None)
+    if not current_top:
+        logging.info("ℹ️  top_videos is empty, falling back to full recompute")
+        return select_top_videos_full(historical_collection)
+
+    candidates = {video["_id"]: video for video in current_top}
+    demoted = False
+    for video in new_videos:
+        stats = video.get("stats")
+        if not stats or not isinstance(stats, dict):
+            continue
+        current = candidates.get(video["_id"])
+        if current is not None and video["engagement_rate"] < current.get("engagement_rate", 0):
+            demoted = True
+        candidates[video["_id"]] = video
+
+    if demoted:
+        logging.info("ℹ️  A top video lost engagement, re-selecting via index")
+        return select_top_videos_indexed(historical_collection)
+
+    merged = sorted(candidates.values(), key=lambda x: x["engagement_rate"], reverse=True)
+    return merged[:TOP_VIDEOS_LIMIT]
+
+
+# Snapshot ranking: setiap update ditulis sebagai dokumen baru di SNAPSHOTS,
+# lalu dokumen pointer "current" diganti dengan replace_one (atomic per dokumen).
+# Reader cukup satu find_one ke pointer yang sudah berisi seluruh ranking.
+TOP_VIDEOS_SNAPSHOTS_COLLECTION = "top_videos_snapshots"
+TOP_VIDEOS_POINTER_COLLECTION = "top_videos_pointer"
+TOP_VIDEOS_POINTER_ID = "current"
+TOP_VIDEOS_SNAPSHOT_RETENTION = int(os.environ.get("TOP_VIDEOS_SNAPSHOT_RETENTION", "7"))
+
+
+def publish_top_videos_snapshot(db, videos, current_time):
+    """
+    Simpan ranking sebagai snapshot versi baru lalu flip pointer ke versi tsb.
+    Returns version string snapshot yang baru
+    """
+    snapshots = db[TOP_VIDEOS_SNAPSHOTS_COLLECTION]
+    pointer = db[TOP_VIDEOS_POINTER_COLLECTION]
+
+    current = pointer.find_one({"_id": TOP_VIDEOS_POINTER_ID}, {"version": 1})
+    version = current_time.strftime("%Y%m%dT%H%M%S%f")
+
+    # Render response /top-videos sekali saat publish (format_number, engagement
+    # string, publication_time, dll.) - endpoint baca cukup meneruskan payload ini
+    payload, _ = build_top_videos_payload(videos)
+    snapshot = {
+        "version": version,
+        "previous_version": current.get("version") if current else None,
+        "videos": videos,
+        "count": len(videos),
+        "last_updated": current_time,
+        "payload": dumps_json(payload).decode("utf-8"),
+    }
+
+    # 1. Tulis snapshot lengkap dulu (belum terlihat oleh reader)
+    snapshots.insert_one({"_id": version, **snapshot})
+
+    # 2. Flip pointer - satu operasi atomic pada satu dokumen
+    pointer.replace_one(
+        {"_id": TOP_VIDEOS_POINTER_ID}, {"_id": TOP_VIDEOS_POINTER_ID, **snapshot}, upsert=True
+    )
+
+    top_videos_response_cache.invalidate()
+
+    # 3. Buang snapshot lama di luar retention (pointer sudah tidak memakainya)
+    try:
+        expired = [
+            doc["_id"]
+            for doc in snapshots.find({}, {"_id": 1})
+            .sort("last_updated", DESCENDING)
+            .skip(TOP_VIDEOS_SNAPSHOT_RETENTION)
+        ]
+        if expired:
+            snapshots.delete_many({"_id": {"$in": expired}})
+    except Exception as e:
+        logging.warning(f"Failed to prune old top_videos snapshots: {e}")
+
+    return version
+
+
+def load_top_videos(db):
+    """
+    Ambil ranking top videos yang aktif dengan satu round-trip ke pointer.
+    Fallback ke collection lama top_videos jika snapshot belum pernah dibuat.
+    """
+    return load_top_videos_snapshot(db)[0]
+
+
+def load_top_videos_snapshot(db):
+    """Seperti load_top_videos, tapi juga mengembalikan version snapshot: (videos, version)"""
+    current = db[TOP_VIDEOS_POINTER_COLLECTION].find_one({"_id": TOP_VIDEOS_POINTER_ID})
+    if current is not None:
+        return current.get("videos", []), current.get("version")
+    videos = list(db["top_videos"].find({}))
+    legacy_updated = videos[0].get("last_updated") if videos else None
+    return videos, str(legacy_updated) if legacy_updated else None
+
+
+def load_top_videos_payload(db):
+    """
+    Ambil version + payload response yang sudah di-render saat publish dalam satu
+    find_one (tanpa array videos mentah). Returns (payload_json, version, last_updated),
+    payload_json None jika snapshot lama / collection legacy belum punya payload
+    """
+    current = db[TOP_VIDEOS_POINTER_COLLECTION].find_one(
+        {"_id": TOP_VIDEOS_POINTER_ID}, {"payload": 1, "version": 1, "last_updated": 1}
+    )
+    if current is not None:
+        return current.get("payload"), current.get("version"), current.get("last_updated")
+    legacy = db["top_videos"].find_one({}, {"last_updated": 1})
+    legacy_updated = legacy.get("last_updated") if legacy else None
+    return None, str(legacy_updated) if legacy_updated else None, legacy_updated
+
+
+def rollback_top_videos(db=None):
+    """
+    Kembalikan pointer ke snapshot sebelumnya.
+    Returns version yang aktif setelah rollback, atau None jika tidak ada snapshot sebelumnya
+    """
+    if db is None:
+        db = get_database()
+
+    current = db[TOP_VIDEOS_POINTER_COLLECTION].find_one(
+        {"_id": TOP_VIDEOS_POINTER_ID}, {"previous_version": 1}
+    )
+    previous_version = current.get("previous_version") if current else None
+    if not previous_version:
+        logging.warning("⚠️  No previous top_videos snapshot to roll back to")
+        return None
+
+    previous = db[TOP_VIDEOS_SNAPSHOTS_COLLECTION].find_one({"_id": previous_version})
+    if previous is None:
+        logging.warning(f"⚠️  Snapshot {previous_version} no longer exists (pruned)")
+        return None
+
+    previous["_id"] = TOP_VIDEOS_POINTER_ID
+    db[TOP_VIDEOS_POINTER_COLLECTION].replace_one(
+        {"_id": TOP_VIDEOS_POINTER_ID}, previous, upsert=True
+    )
+    top_videos_response_cache.invalidate()
+    logging.info(f"⏪ Rolled back top_videos to snapshot {previous_version}")
+    return previous_version
+
+
+def update_top_videos(db=None, new_videos=None, full_recompute=False):
+    """
+    Publish snapshot top_videos baru berisi top 10 video berdasarkan engagement rate.
+
+    Mode incremental (default saat new_videos diberikan): merge video yang baru
+    di-upsert dengan top set saat ini, tanpa scan historical_data.
+    Mode full (full_recompute=True atau new_videos=None): hitung ulang
+    engagement_rate semua dokumen di server lalu ambil top 10 via index.
     """
     try:
         logging.info("🔄 Starting top_videos update process...")
         
-        # Connect to database
-        db = get_database()
+        # Connect to database (reuse handle dari caller jika ada)
+        if db is None:
+            db = get_database()
         historical_collection = db["historical_data"]
-        top_videos_collection = db["top_videos"]
-        
-        # Query all videos from historical_data
-        all_videos = list(historical_collection.find({}))
-        logging.info(f"📊 Found {len(all_videos)} videos in historical_data")
-        
-        if not all_videos:
-            logging.warning("⚠️  No videos found in historical_data, skipping update")
-            return
-        
-        # Calculate engagement rate for each video
-        videos_with_engagement = []
-        skipped_count = 0
-        
-        for video in all_videos:
-            try:
-                stats = video.get("stats", {})
-                
-                # Validate stats
-                if not stats or not isinstance(stats, dict):
-                    logging.warning(f"Skipping video {video.get('_id', 'unknown')}: invalid stats")
-                    skipped_count += 1
-                    continue
-                
-                play_count = stats.get("play_count", 0)
-                digg_count = stats.get("digg_count", 0)
-                
-                # Handle division by zero
-                if play_count == 0:
-                    engagement_rate = 0.0
-                else:
-                    engagement_rate = (digg_count / play_count) * 100
-                
-                # Add engagement rate to video document
-                video["engagement_rate"] = engagement_rate
-                videos_with_engagement.append(video)
-                
-            except Exception as e:
-                logging.warning(f"Error processing video {video.get('_id', 'unknown')}: {str(e)[:100]}")
-                skipped_count += 1
-                continue
         
-        if skipped_count > 0:
-            logging.info(f"⚠️  Skipped {skipped_count} videos due to invalid data")
+        if full_recompute or new_videos is None:
+            logging.info("📊 Mode: full recompute")
+            top_10 = select_top_videos_full(historical_collection)
+        else:
+            logging.info(f"📊 Mode: incremental ({len(new_videos)} new videos)")
+            top_10 = select_top_videos_incremental(
+                db, historical_collection, new_videos
+            )
         
-        if not videos_with_engagement:
-            logging.error("❌ No valid videos to process, aborting update")
+        if not top_10:
+            logging.warning("⚠️  No valid videos found in historical_data, skipping update")
             return
         
-        # Sort by engagement rate descending
-        videos_with_engagement.sort(key=lambda x: x["engagement_rate"], reverse=True)
-        
-        # Select top 10 videos
-        top_10 = videos_with_engagement[:10]
         logging.info(f"✅ Selected top {len(top_10)} videos")
         
         # Add last_updated timestamp to each video
-        current_time = datetime.now()
+        # Presisi milidetik (sama dengan BSON datetime) agar payload yang di-render
+        # saat publish identik dengan nilai last_updated yang tersimpan
+        now = datetime.now()
+        current_time = now.replace(microsecond=now.microsecond // 1000 * 1000)
         for video in top_10:
             video["last_updated"] = current_time
         
-        # Clear top_videos collection
+        # Publish snapshot baru lalu flip pointer secara atomic -
+        # reader tidak pernah melihat ranking kosong/setengah jadi
         try:
-            delete_result = top_videos_collection.delete_many({})
-            logging.info(f"🗑️  Cleared {delete_result.deleted_count} old documents from top_videos")
-        except Exception as e:
-            logging.error(f"❌ Failed to clear top_videos collection: {e}")
-            logging.error("Aborting update to preserve existing data")
-            return
-        
-        # Insert new top 10 videos
-        try:
-            insert_result = top_videos_collection.insert_many(top_10)
-            logging.info(f"✅ Inserted {len(insert_result.inserted_ids)} videos into top_videos")
+            version = publish_top_videos_snapshot(db, top_10, current_time)
+            logging.info(f"✅ Published top_videos snapshot {version} ({len(top_10)} videos)")
             logging.info(f"📅 Update completed at {current_time.isoformat()}")
             
             # Log top 3 videos for verification
@@ -414,9 +586,8 @@ def update_top_videos():
                 logging.info(f"  #{i}: {video.get('description', 'No description')[:50]}... (engagement: {video['engagement_rate']:.2f}%)")
             
         except Exception as e:
-            logging.error(f"❌ Failed to insert top videos: {e}")
-            # Attempt to rollback by keeping collection empty is acceptable
-            # since we already cleared it
+            logging.error(f"❌ Failed to publish top videos snapshot: {e}")
+            # Pointer belum berubah, reader tetap melihat snapshot sebelumnya
             raise
         
     except Exception as e:
@@ -424,6 +595,102 @@ def update_top_videos():
         raise
 
 
+# --- 4b. BULK UPSERT KE HISTORICAL DATA ---
+INGEST_BATCH_SIZE = int(os.environ.get("INGEST_BATCH_SIZE", "500"))
+# Jumlah page/batch yang boleh antre di antara stage pipeline (backpressure)
+INGEST_QUEUE_SIZE = int(os.environ.get("INGEST_QUEUE_SIZE", "4"))
+
+
+def upsert_videos_bulk(collection, videos, batch_size=None):
+    """
+    Upsert banyak video dengan unordered bulk_write per batch (satu round-trip per batch).
+    Error per dokumen dari BulkWriteError dipetakan kembali ke video_id.
+    Returns dict dengan inserted, modified, failed, failed_ids, saved_videos,
+    inserted_videos (subset saved_videos yang baru pertama kali masuk)
+    """
+    batch_size = batch_size or INGEST_BATCH_SIZE
+    result = {
+        "inserted": 0,
+        "modified": 0,
+        "failed": 0,
+        "failed_ids": [],
+        "saved_videos": [],
+        "inserted_videos": [],
+    }
+
+    for start in range(0, len(videos), batch_size):
+        batch = videos[start:start + batch_size]
+        operations = [
+            # Update jika ada, Insert jika baru; first_seen_at hanya ditulis saat insert
+            # (fetched_at ditimpa setiap refetch) - dipakai bucket harian hashtag_stats
+            UpdateOne(
+                {"_id": video["_id"]},
+                {"$set": video, "$setOnInsert": {"first_seen_at": video.get("fetched_at")}},
+                upsert=True,
+            )
+            for video in batch
+        ]
+        failed_indexes = set()
+        try:
+            bulk_result = collection.bulk_write(operations, ordered=False)
+            details = bulk_result.bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+            for error in details.get("writeErrors", []):
+                failed_indexes.add(error["index"])
+                video_id = batch[error["index"]].get("_id")
+                result["failed_ids"].append(video_id)
+                logging.warning(f"Gagal upsert video {video_id}: {error.get('errmsg', '')[:100]}")
+        except Exception as e:
+            # Error di level batch (mis. koneksi) - seluruh batch dianggap gagal
+            logging.error(f"Bulk upsert batch gagal: {str(e)[:200]}")
+            result["failed"] += len(batch)
+            result["failed_ids"].extend(video.get("_id") for video in batch)
+            continue
+
+        result["inserted"] += details.get("nUpserted", 0)
+        result["modified"] += details.get("nModified", 0)
+        result["failed"] += len(failed_indexes)
+        result["saved_videos"].extend(
+            video for index, video in enumerate(batch) if index not in failed_indexes
+        )
+        result["inserted_videos"].extend(
+            batch[upserted["index"]] for upserted in details.get("upserted", [])
+        )
+
+    return result
+
+
+class TopCandidatesCollector:
+    """
+    Kumpulkan video baru yang relevan untuk update top videos incremental dengan
+    memory konstan: top N video baru (heap) + video yang saat ini ada di top set
+    (perlu dicek apakah turun peringkat). Video baru lain tidak mungkin masuk top N.
+    """
+
+    def __init__(self, watched_ids, limit=TOP_VIDEOS_LIMIT):
+        self.limit = limit
+        self.watched_ids = set(watched_ids)
+        self._watched = {}
+        self._heap = []
+        self._counter = itertools.count()
+
+    def add(self, videos):
+        for video in videos:
+            if video["_id"] in self.watched_ids:
+                self._watched[video["_id"]] = video
+            entry = (video.get("engagement_rate", 0.0), next(self._counter), video)
+            if len(self._heap) < self.limit:
+                heapq.heappush(self._heap, entry)
+            elif entry[0] > self._heap[0][0]:
+                heapq.heapreplace(self._heap, entry)
+
+    def videos(self):
+        candidates = {entry[2]["_id"]: entry[2] for entry in self._heap}
+        candidates.update(self._watched)
+        return list(candidates.values())
+
+
 # --- 5. SCHEDULER (PENGGANTI SETINTERVAL) ---
 # Ganti "0 0 0 * * *" jika ingin interval lain.
 # Contoh tiap 10 menit: "0 */10 * * * *"
@@ -438,55 +705,198 @@ def daily_fetch_tiktok(myTimer: func.TimerRequest) -> None:
         "🚀 [Azure Function] Memulai fetch trending (Replacement for JS Script)..."
     )
 
-    # A. Konek Database
-    db = get_database()
-    collection = db["historical_data"]
+    # A. Konek Database (atau sink JSONL lokal saat dry-run)
+    dry_run_path = os.environ.get("INGEST_DRY_RUN_PATH")
+    if dry_run_path:
+        logging.info(f"🧪 Dry-run: menulis hasil ingest ke {dry_run_path}")
+        sink = JsonlSink(dry_run_path)
+        write_batch = sink.write_batch
+        db = None
+    else:
+        sink = None
+        db = get_database()
+        collection = db["historical_data"]
 
-    # B. Fetch dari API
-    video_list = fetch_trending_tiktok()
-    logging.info(f"📦 Berhasil mengambil {len(video_list)} items dari API.")
+        def write_batch(docs):
+            # State sebelum upsert untuk delta engagement hashtag_stats (video yang di-fetch ulang)
+            try:
+                previous = load_hashtag_preimages(collection, docs)
+            except Exception as e:
+                logging.warning(f"Failed to load hashtag pre-images: {e}")
+                previous = {}
+            result = upsert_videos_bulk(collection, docs)
+            # Append snapshot stats (history) untuk video yang berhasil di-upsert
+            try:
+                record_stats_snapshots(db, result["saved_videos"])
+            except Exception as e:
+                logging.warning(f"Failed to record stats history: {e}")
+            # Materialized hashtag_stats: hanya video baru yang menambah hitungan,
+            # video lama hanya mengoreksi engagement/play_count (delta)
+            updates = [
+                (previous[video["_id"]], video)
+                for video in result["saved_videos"] if video["_id"] in previous
+            ]
+            try:
+                record_hashtag_stats(db, result["inserted_videos"], updates=updates)
+            except Exception as e:
+                logging.warning(f"Failed to update hashtag stats: {e}")
+            return result
 
-    if not video_list:
-        logging.info("Tidak ada data untuk disimpan.")
-        return
+    # Hanya video yang bisa mempengaruhi ranking yang disimpan di memory
+    collector = TopCandidatesCollector(
+        watched_ids=[] if db is None else [v["_id"] for v in load_top_videos(db)]
+    )
 
-    # C. Simpan ke MongoDB (Upsert Strategy)
+    # B + C. Pipeline streaming: fetch page -> process_video_data -> bulk upsert
     # Kita tidak pakai "append file" seperti di JS, tapi "Upsert" database
     # Agar data tidak duplikat tapi selalu ter-update
-    success_count = 0
-    for item in video_list:
-        try:
-            clean_data = process_video_data(item)
+    try:
+        report = run_ingest_pipeline(
+            iter_trending_tiktok_pages(),
+            transform=process_video_data,
+            write_batch=write_batch,
+            batch_size=INGEST_BATCH_SIZE,
+            queue_size=INGEST_QUEUE_SIZE,
+            on_written=lambda result: collector.add(result["saved_videos"]),
+        )
+    finally:
+        if sink is not None:
+            sink.close()
 
-            # Update jika ada, Insert jika baru
-            collection.update_one(
-                {"_id": clean_data["_id"]}, {"$set": clean_data}, upsert=True
-            )
-            success_count += 1
-        except Exception as e:
-            logging.warning(f"Gagal memproses item: {e}")
+    logging.info(f"📦 Berhasil mengambil {report['fetch']['items']} items dari API.")
+    logging.info(f"📈 Ingest metrics: {report}")
+
+    if not report["fetch"]["items"]:
+        logging.info("Tidak ada data untuk disimpan.")
+        return
 
     logging.info(
-        f"✅ Selesai! {success_count} data berhasil disimpan/diupdate di MongoDB."
+        f"✅ Selesai! {report['write']['items']} data berhasil disimpan/diupdate di MongoDB "
+        f"(inserted={report['inserted']}, modified={report['modified']}, failed={report['failed']})."
     )
+
+    if db is None:
+        return
     
     # D. Update top_videos collection
     try:
         logging.info("🔄 Triggering top_videos update...")
-        update_top_videos()
+        update_top_videos(db, new_videos=collector.videos())
         logging.info("✅ Top videos update completed successfully")
     except Exception as e:
         logging.error(f"❌ Top videos update failed: {e}")
         logging.error("Continuing with existing top_videos data")
 
 
+# --- HELPER PREDIKSI (dipakai oleh /predict dan /predict/batch) ---
+PREDICT_REQUIRED_FIELDS = [
+    "video_duration",
+    "hashtags_count",
+    "schedule_time",
+    "music_title",
+]
+
+# Cache hasil /predict (LRU + TTL), dikosongkan otomatis saat model baru di-load
+prediction_cache = LRUCache(
+    maxsize=int(os.environ.get("PREDICTION_CACHE_SIZE", "4096")),
+    ttl=float(os.environ.get("PREDICTION_CACHE_TTL", "3600")),
+)
+model_loader.register_reload_callback(prediction_cache.clear)
+
+# Batas jumlah item per request /predict/batch
+PREDICT_BATCH_MAX_SIZE = int(os.environ.get("PREDICT_BATCH_MAX_SIZE", "1000"))
+
+
+def parse_prediction_input(item):
+    """
+    Validasi satu input prediksi dan ekstrak fitur waktu dari schedule_time.
+    Returns tuple (parsed, error) - salah satunya selalu None
+    """
+    if not isinstance(item, dict):
+        return None, "Item must be a JSON object"
+
+    for field in PREDICT_REQUIRED_FIELDS:
+        if field not in item:
+            return None, f"Missing required field: {field}"
+
+    for field in ("video_duration", "hashtags_count"):
+        value = item[field]
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return None, f"Field {field} must be a number"
+        if value < 0:
+            return None, f"Field {field} must not be negative"
+
+    try:
+        schedule_dt = datetime.fromisoformat(
+            str(item["schedule_time"]).replace("Z", "+00:00")
+        )
+    except ValueError:
+        return None, "Invalid schedule_time format. Use ISO format."
+
+    parsed = {
+        "video_duration": item["video_duration"],
+        "hashtags_count": item["hashtags_count"],
+        "upload_hour": schedule_dt.hour,
+        "upload_day": schedule_dt.weekday(),  # 0=Monday, 6=Sunday
+        "upload_month": schedule_dt.month,
+        "music_title": item["music_title"],
+    }
+    return parsed, None
+
+
+def build_feature_matrix(parsed_items, bundle, music_codes=None):
+    """
+    Susun 2D feature matrix (urutan kolom sama dengan training).
+    Music title di-encode sekali jalan lewat encode_music_batch milik bundle,
+    kecuali kode musik sudah diberikan (mis. /predict yang butuh detail match).
+    """
+    if music_codes is None:
+        music_codes = bundle.encode_music_batch(
+            [item["music_title"] for item in parsed_items]
+        )
+    feature_matrix = np.empty((len(parsed_items), 6), dtype=np.float64)
+    for row, item in enumerate(parsed_items):
+        feature_matrix[row, 0] = item["video_duration"]
+        feature_matrix[row, 1] = item["hashtags_count"]
+        feature_matrix[row, 2] = item["upload_hour"]
+        feature_matrix[row, 3] = item["upload_day"]
+        feature_matrix[row, 4] = item["upload_month"]
+    feature_matrix[:, 5] = music_codes
+    return feature_matrix
+
+
+def score_feature_matrix(model, label_encoder, feature_matrix):
+    """
+    Jalankan predict_proba sekali untuk semua baris.
+    Label diambil dari argmax probabilitas (hasil sama dengan model.predict).
+    Returns tuple (labels, probability_matrix)
+    """
+    probability_matrix = model.predict_proba(feature_matrix)
+    predicted_classes = np.asarray(model.classes_)[probability_matrix.argmax(axis=1)]
+    labels = label_encoder.inverse_transform(predicted_classes)
+    return labels, probability_matrix
+
+
+def format_prediction(label, probabilities, class_labels):
+    """Format satu baris hasil prediksi untuk response JSON"""
+    return {
+        "prediction": str(label),
+        # Confidence score = probabilitas dari kelas yang diprediksi
+        "confidence_score": float(probabilities.max()),
+        "probabilities": [
+            {"label": str(class_labels[i]), "score": float(prob)}
+            for i, prob in enumerate(probabilities)
+        ],
+    }
+
+
 # --- 5. API ENDPOINT UNTUK PREDIKSI ENGAGEMENT ---
 @app.route(route="predict", auth_level=func.AuthLevel.ANONYMOUS, methods=["POST"])
 def predict_engagement(req: func.HttpRequest) -> func.HttpResponse:
     """
     API endpoint untuk memprediksi engagement video TikTok
     Input: JSON dengan video_duration, hashtags_count, schedule_time, music_title
-    Output: JSON dengan prediction, confidence_score, probabilities
+    Output: JSON dengan prediction, confidence_score, probabilities, shap_values
     """
     logging.info("🚀 Predict engagement API called")
 
@@ -495,105 +905,102 @@ def predict_engagement(req: func.HttpRequest) -> func.HttpResponse:
         req_body = req.get_json()
         if not req_body:
             return func.HttpResponse(
-                json.dumps({"error": "Request body is required"}),
+                dumps_json({"error": "Request body is required"}),
                 status_code=400,
                 mimetype="application/json",
             )
 
-        # Validasi input fields
-        required_fields = [
-            "video_duration",
-            "hashtags_count",
-            "schedule_time",
-            "music_title",
-        ]
-        for field in required_fields:
-            if field not in req_body:
-                return func.HttpResponse(
-                    json.dumps({"error": f"Missing required field: {field}"}),
-                    status_code=400,
-                    mimetype="application/json",
-                )
-
-        # Extract input data
-        video_duration = req_body["video_duration"]
-        hashtags_count = req_body["hashtags_count"]
-        schedule_time = req_body["schedule_time"]
-        music_title = req_body["music_title"]
-
-        # Feature engineering dari schedule_time
-        try:
-            schedule_dt = datetime.fromisoformat(schedule_time.replace("Z", "+00:00"))
-            upload_hour = schedule_dt.hour
-            upload_day = schedule_dt.weekday()  # 0=Monday, 6=Sunday
-            upload_month = schedule_dt.month
-        except Exception as e:
-            logging.error(f"Error parsing schedule_time: {e}")
+        # Validasi input & feature engineering - helper yang sama dengan /predict/batch
+        parsed, error = parse_prediction_input(req_body)
+        if error:
             return func.HttpResponse(
-                json.dumps({"error": "Invalid schedule_time format. Use ISO format."}),
+                dumps_json({"error": error}),
                 status_code=400,
                 mimetype="application/json",
             )
+        music_title = parsed["music_title"]
 
-        # Load models
+        # Load models - satu bundle dipakai sampai response selesai (aman saat hot reload)
         try:
-            model = model_loader.get_model()
-            label_encoder = model_loader.get_label_encoder()
+            bundle = model_loader.get_bundle()
+            model = bundle.model
+            label_encoder = bundle.label_encoder
         except Exception as e:
             logging.error(f"Model loading error: {e}")
             return func.HttpResponse(
-                json.dumps({"error": "Model not initialized"}),
+                dumps_json({"error": "Model not initialized"}),
                 status_code=500,
                 mimetype="application/json",
             )
 
-        # Encode music title
-        try:
-            music_encoded = model_loader.encode_music(music_title)
-        except Exception as e:
-            logging.error(f"Music encoding error: {e}")
-            music_encoded = 0  # fallback value
-
-        # Prepare feature vector untuk model
-        # Sesuaikan dengan feature order yang digunakan saat training
-        features = [
-            video_duration,
-            hashtags_count,
-            upload_hour,
-            upload_day,
-            upload_month,
-            music_encoded,
-        ]
-
-        # Convert ke format yang dibutuhkan model (2D array)
-        feature_array = np.array([features])
+        # Encode music title (exact atau fuzzy match ke vocabulary), lalu susun
+        # feature matrix 1 baris dengan urutan kolom yang sama seperti training
+        music_match = bundle.match_music(music_title)
+        feature_array = build_feature_matrix(
+            [parsed], bundle, music_codes=[music_match["code"]]
+        )
+        features = feature_array[0].tolist()
 
         logging.info(f"Features prepared: {features}")
 
         # Prediksi
         try:
-            # Get prediction (class)
-            prediction_numeric = model.predict(feature_array)[0]
-            prediction_label = label_encoder.inverse_transform([prediction_numeric])[0]
-
-            # Get probabilities
-            probabilities = model.predict_proba(feature_array)[0]
-            class_labels = label_encoder.classes_
-
-            # Confidence score = probabilitas dari kelas yang diprediksi
-            confidence_score = float(max(probabilities))
+            # Cek cache dulu - key = feature tuple final + versi model
+            cache_key = (
+                tuple(features),
+                bundle.version,
+            )
+            result = prediction_cache.get(cache_key)
 
-            # Format probabilities untuk response
-            prob_list = []
-            for i, prob in enumerate(probabilities):
-                prob_list.append({"label": class_labels[i], "score": float(prob)})
+            if result is None:
+                # Satu kali predict_proba, label dari argmax (tanpa model.predict terpisah)
+                labels, probability_matrix = score_feature_matrix(
+                    model, label_encoder, feature_array
+                )
+                result = format_prediction(
+                    labels[0], probability_matrix[0], label_encoder.classes_
+                )
+                # SHAP values (TreeSHAP native LightGBM) ikut di-memoize bersama prediksi
+                try:
+                    contributions = compute_contributions(model, feature_array)
+                    shap_values, base_value, insight = format_explanation(
+                        contributions[0], int(probability_matrix[0].argmax()),
+                        feature_array[0], result["prediction"],
+                    )
+                except Exception as e:
+                    logging.warning(f"SHAP explanation failed: {e}")
+                    shap_values, base_value = [], None
+                    insight = (
+                        f"Video duration ({parsed['video_duration']}s) and hashtags "
+                        f"({parsed['hashtags_count']}) contribute to engagement prediction."
+                    )
+                result.update({
+                    "shap_insight": insight,
+                    "shap_values": shap_values,
+                    "shap_base_value": base_value,
+                })
+                prediction_cache.set(cache_key, result)
+            else:
+                logging.info(f"Prediction cache hit ({prediction_cache.stats()})")
+
+            prediction_label = result["prediction"]
+            confidence_score = result["confidence_score"]
+            prob_list = result["probabilities"]
 
             # Response JSON
             response_data = {
                 "prediction": prediction_label,
                 "confidence_score": confidence_score,
                 "probabilities": prob_list,
-                "shap_insight": f"Video duration ({video_duration}s) and hashtags ({hashtags_count}) contribute to engagement prediction.",
+                "shap_insight": result["shap_insight"],
+                "shap_values": result["shap_values"],
+                "shap_base_value": result["shap_base_value"],
+                "music_match": {
+                    "input": music_title,
+                    "matched_title": music_match["matched_title"],
+                    "similarity": music_match["similarity"],
+                },
+                "model_version": bundle.version,
             }
 
             logging.info(
@@ -601,46 +1008,469 @@ def predict_engagement(req: func.HttpRequest) -> func.HttpResponse:
             )
 
             return func.HttpResponse(
-                json.dumps(response_data), status_code=200, mimetype="application/json"
+                dumps_json(response_data), status_code=200, mimetype="application/json"
             )
 
         except Exception as e:
             logging.error(f"Prediction error: {e}")
             return func.HttpResponse(
-                json.dumps({"error": f"Prediction failed: {str(e)}"}),
+                dumps_json({"error": f"Prediction failed: {str(e)}"}),
+                status_code=500,
+                mimetype="application/json",
+            )
+
+    except Exception as e:
+        logging.error(f"General API error: {e}")
+        return func.HttpResponse(
+            dumps_json({"error": "Internal server error"}),
+            status_code=500,
+            mimetype="application/json",
+        )
+
+
+# --- 5b. API ENDPOINT UNTUK BATCH PREDIKSI ---
+@app.route(route="predict/batch", auth_level=func.AuthLevel.ANONYMOUS, methods=["POST"])
+def predict_engagement_batch(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    API endpoint untuk memprediksi banyak kombinasi input sekaligus
+    Input: JSON {"items": [...]} dengan field yang sama seperti /predict
+    Output: JSON dengan results per item (prediction atau error), count
+    """
+    logging.info("🚀 Batch predict engagement API called")
+
+    try:
+        try:
+            req_body = req.get_json()
+        except ValueError:
+            req_body = None
+
+        items = req_body.get("items") if isinstance(req_body, dict) else req_body
+        if not isinstance(items, list) or not items:
+            return func.HttpResponse(
+                dumps_json({"error": "Request body must contain a non-empty 'items' array"}),
+                status_code=400,
+                mimetype="application/json",
+            )
+
+        if len(items) > PREDICT_BATCH_MAX_SIZE:
+            return func.HttpResponse(
+                dumps_json({"error": f"Batch size exceeds limit of {PREDICT_BATCH_MAX_SIZE} items"}),
+                status_code=400,
+                mimetype="application/json",
+            )
+
+        # Validasi per item - item yang invalid tidak menggagalkan batch
+        results = [None] * len(items)
+        valid_indices = []
+        valid_items = []
+        for index, item in enumerate(items):
+            parsed, error = parse_prediction_input(item)
+            if error:
+                results[index] = {"index": index, "error": error}
+            else:
+                valid_indices.append(index)
+                valid_items.append(parsed)
+
+        if valid_items:
+            # Load models (satu bundle untuk seluruh batch)
+            try:
+                bundle = model_loader.get_bundle()
+                model = bundle.model
+                label_encoder = bundle.label_encoder
+            except Exception as e:
+                logging.error(f"Model loading error: {e}")
+                return func.HttpResponse(
+                    dumps_json({"error": "Model not initialized"}),
+                    status_code=500,
+                    mimetype="application/json",
+                )
+
+            try:
+                feature_matrix = build_feature_matrix(valid_items, bundle)
+                labels, probability_matrix = score_feature_matrix(
+                    model, label_encoder, feature_matrix
+                )
+            except Exception as e:
+                logging.error(f"Batch prediction error: {e}")
+                return func.HttpResponse(
+                    dumps_json({"error": f"Prediction failed: {str(e)}"}),
+                    status_code=500,
+                    mimetype="application/json",
+                )
+
+            class_labels = label_encoder.classes_
+            for row, index in enumerate(valid_indices):
+                result = format_prediction(labels[row], probability_matrix[row], class_labels)
+                result["index"] = index
+                results[index] = result
+
+        error_count = len(items) - len(valid_items)
+        response_data = {
+            "results": results,
+            "count": len(items),
+            "success_count": len(valid_items),
+            "error_count": error_count,
+            "model_version": bundle.version if valid_items else model_loader.get_model_version(),
+        }
+
+        logging.info(
+            f"✅ Batch prediction done: {len(valid_items)} scored, {error_count} invalid"
+        )
+
+        return func.HttpResponse(
+            dumps_json(response_data), status_code=200, mimetype="application/json"
+        )
+
+    except Exception as e:
+        logging.error(f"General API error: {e}")
+        return func.HttpResponse(
+            dumps_json({"error": "Internal server error"}),
+            status_code=500,
+            mimetype="application/json",
+        )
+
+
+# --- 5c. API ENDPOINT UNTUK OPTIMASI JADWAL UPLOAD ---
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Grid 24 jam x 7 hari sebagai kolom (upload_hour, upload_day), dibangun sekali
+SCHEDULE_GRID = np.array(
+    [(hour, day) for day in range(7) for hour in range(24)], dtype=np.float64
+)
+
+# Cache hasil grid per (durasi, hashtag, musik, bulan, versi model)
+schedule_cache = LRUCache(maxsize=int(os.environ.get("SCHEDULE_CACHE_SIZE", "256")))
+model_loader.register_reload_callback(schedule_cache.clear)
+
+
+def rank_schedule_slots(video_duration, hashtags_count, music_encoded, upload_month,
+                        model, label_encoder):
+    """
+    Skor seluruh 168 slot (jam x hari) dengan satu panggilan predict_proba,
+    lalu urutkan dari probabilitas engagement tertinggi.
+    """
+    slot_count = len(SCHEDULE_GRID)
+    feature_matrix = np.empty((slot_count, 6), dtype=np.float64)
+    feature_matrix[:, 0] = video_duration
+    feature_matrix[:, 1] = hashtags_count
+    feature_matrix[:, 2:4] = SCHEDULE_GRID
+    feature_matrix[:, 4] = upload_month
+    feature_matrix[:, 5] = music_encoded
+
+    labels, probability_matrix = score_feature_matrix(model, label_encoder, feature_matrix)
+
+    # Urutkan berdasarkan probabilitas kelas "tinggi" (fallback: kelas terakhir)
+    class_labels = list(label_encoder.classes_)
+    target_index = class_labels.index("tinggi") if "tinggi" in class_labels else len(class_labels) - 1
+    order = np.argsort(-probability_matrix[:, target_index], kind="stable")
+
+    ranked_slots = []
+    for rank, row in enumerate(order, 1):
+        slot = format_prediction(labels[row], probability_matrix[row], class_labels)
+        hour = int(SCHEDULE_GRID[row, 0])
+        day = int(SCHEDULE_GRID[row, 1])
+        slot.update({
+            "rank": rank,
+            "upload_hour": hour,
+            "upload_day": day,
+            "day_name": DAY_NAMES[day],
+            "score": float(probability_matrix[row, target_index]),
+        })
+        ranked_slots.append(slot)
+    return ranked_slots
+
+
+@app.route(route="optimize-schedule", auth_level=func.AuthLevel.ANONYMOUS, methods=["POST"])
+def optimize_schedule(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    API endpoint untuk mencari jam & hari upload terbaik
+    Input: JSON dengan video_duration, hashtags_count, music_title (opsional: month, top_n)
+    Output: JSON dengan slots (ranking jam x hari), best_slot, cached
+    """
+    logging.info("🚀 Optimize schedule API called")
+
+    try:
+        try:
+            req_body = req.get_json()
+        except ValueError:
+            req_body = None
+
+        if not isinstance(req_body, dict):
+            return func.HttpResponse(
+                dumps_json({"error": "Request body is required"}),
+                status_code=400,
+                mimetype="application/json",
+            )
+
+        for field in ("video_duration", "hashtags_count", "music_title"):
+            if field not in req_body:
+                return func.HttpResponse(
+                    dumps_json({"error": f"Missing required field: {field}"}),
+                    status_code=400,
+                    mimetype="application/json",
+                )
+
+        for field in ("video_duration", "hashtags_count"):
+            value = req_body[field]
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+                return func.HttpResponse(
+                    dumps_json({"error": f"Field {field} must be a non-negative number"}),
+                    status_code=400,
+                    mimetype="application/json",
+                )
+
+        upload_month = req_body.get("month", datetime.now(timezone.utc).month)
+        top_n = req_body.get("top_n", 10)
+        if isinstance(upload_month, bool) or not isinstance(upload_month, int) or not 1 <= upload_month <= 12:
+            return func.HttpResponse(
+                dumps_json({"error": "Field month must be an integer between 1 and 12"}),
+                status_code=400,
+                mimetype="application/json",
+            )
+        if isinstance(top_n, bool) or not isinstance(top_n, int) or not 1 <= top_n <= len(SCHEDULE_GRID):
+            return func.HttpResponse(
+                dumps_json({"error": f"Field top_n must be an integer between 1 and {len(SCHEDULE_GRID)}"}),
+                status_code=400,
+                mimetype="application/json",
+            )
+
+        # Durasi dibulatkan ke detik agar input yang hampir sama berbagi cache entry
+        video_duration = int(round(req_body["video_duration"]))
+        hashtags_count = int(req_body["hashtags_count"])
+
+        # Load models
+        try:
+            bundle = model_loader.get_bundle()
+            model = bundle.model
+            label_encoder = bundle.label_encoder
+            model_version = bundle.version
+        except Exception as e:
+            logging.error(f"Model loading error: {e}")
+            return func.HttpResponse(
+                dumps_json({"error": "Model not initialized"}),
                 status_code=500,
                 mimetype="application/json",
             )
 
+        music_encoded = int(bundle.encode_music_batch([req_body["music_title"]])[0])
+
+        cache_key = (video_duration, hashtags_count, music_encoded, upload_month, model_version)
+        ranked_slots = schedule_cache.get(cache_key)
+        cached = ranked_slots is not None
+
+        if not cached:
+            try:
+                ranked_slots = rank_schedule_slots(
+                    video_duration, hashtags_count, music_encoded, upload_month,
+                    model, label_encoder,
+                )
+            except Exception as e:
+                logging.error(f"Schedule optimization error: {e}")
+                return func.HttpResponse(
+                    dumps_json({"error": f"Prediction failed: {str(e)}"}),
+                    status_code=500,
+                    mimetype="application/json",
+                )
+            schedule_cache.set(cache_key, ranked_slots)
+
+        response_data = {
+            "slots": ranked_slots[:top_n],
+            "best_slot": ranked_slots[0],
+            "evaluated_slots": len(ranked_slots),
+            "month": upload_month,
+            "cached": cached,
+            "model_version": model_version,
+        }
+
+        logging.info(
+            f"✅ Schedule optimized (cached={cached}): best {ranked_slots[0]['day_name']} "
+            f"{ranked_slots[0]['upload_hour']:02d}:00"
+        )
+
+        return func.HttpResponse(
+            dumps_json(response_data), status_code=200, mimetype="application/json"
+        )
+
     except Exception as e:
         logging.error(f"General API error: {e}")
         return func.HttpResponse(
-            json.dumps({"error": "Internal server error"}),
+            dumps_json({"error": "Internal server error"}),
             status_code=500,
             mimetype="application/json",
         )
 
 
 # --- 6. API ENDPOINT UNTUK TOP 10 VIDEOS ---
+# Data top videos hanya berubah sekali sehari (daily_fetch_tiktok jam 00:00 UTC).
+# Response di-cache in-process per version snapshot sampai fetch berikutnya,
+# dan dicek ulang ke database paling lama setiap TOP_VIDEOS_CACHE_RECHECK detik
+# (menangkap update manual seperti migration/rollback dari worker lain).
+TOP_VIDEOS_CACHE_RECHECK = int(os.environ.get("TOP_VIDEOS_CACHE_RECHECK", "300"))
+# Jeda setelah jadwal fetch sebelum data baru dianggap tersedia
+TOP_VIDEOS_FETCH_GRACE = int(os.environ.get("TOP_VIDEOS_FETCH_GRACE", "600"))
+
+
+def next_scheduled_fetch(now):
+    """Waktu daily_fetch_tiktok berikutnya (schedule "0 0 0 * * *" = tengah malam UTC) + grace"""
+    next_midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    grace = timedelta(seconds=TOP_VIDEOS_FETCH_GRACE)
+    # Masih di dalam jendela grace setelah fetch hari ini
+    if now < next_midnight - timedelta(days=1) + grace:
+        return next_midnight - timedelta(days=1) + grace
+    return next_midnight + grace
+
+
+def build_top_videos_payload(raw_videos):
+    """
+    Transform dokumen snapshot jadi response JSON.
+    Returns (response_data, last_updated_dt)
+    """
+    # Get last_updated timestamp from first video (all should have same timestamp)
+    last_updated = None
+    last_updated_dt = raw_videos[0].get("last_updated") if raw_videos else None
+    if last_updated_dt:
+        if isinstance(last_updated_dt, datetime):
+            last_updated = last_updated_dt.isoformat()
+        else:
+            last_updated = str(last_updated_dt)
+            last_updated_dt = None
+
+    # Transform documents with error resilience
+    videos = []
+    failed_count = 0
+    for video in raw_videos:
+        try:
+            transformed = transform_mongo_doc(video)
+            videos.append(transformed)
+        except Exception as e:
+            failed_count += 1
+            logging.warning(f"Failed to transform video {video.get('_id', 'unknown')}: {str(e)[:100]}")
+            # Continue processing other videos
+
+    if failed_count > 0:
+        logging.warning(f"Failed to transform {failed_count} out of {len(raw_videos)} documents")
+
+    response_data = {
+        "videos": videos,
+        "count": len(videos),
+        "last_updated": last_updated or datetime.now().isoformat(),
+    }
+    return response_data, last_updated_dt
+
+
+class TopVideosResponseCache:
+    """Cache satu response /top-videos yang sudah di-serialize, keyed by version snapshot"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entry = None
+
+    def get_fresh(self, now):
+        """Return entry jika belum perlu dicek ulang ke database"""
+        with self._lock:
+            entry = self._entry
+        if entry is not None and now < entry["recheck_at"]:
+            return entry
+        return None
+
+    def revalidate(self, version, now):
+        """Version di database masih sama -> perpanjang entry tanpa rebuild"""
+        with self._lock:
+            entry = self._entry
+            if entry is None or entry["version"] != version:
+                return None
+            entry["recheck_at"] = self._recheck_at(entry, now)
+            return entry
+
+    def store(self, version, body, last_updated_dt, now):
+        if last_updated_dt is not None and last_updated_dt.tzinfo is None:
+            # last_updated disimpan sebagai waktu server (UTC di Azure)
+            last_updated_dt = last_updated_dt.replace(tzinfo=timezone.utc)
+        etag_source = version or hashlib.sha1(body).hexdigest()
+        entry = {
+            "version": version,
+            "body": body,
+            "etag": f'"{etag_source}"',
+            "last_modified": last_updated_dt,
+        }
+        entry["recheck_at"] = self._recheck_at(entry, now)
+        with self._lock:
+            self._entry = entry
+        return entry
+
+    def invalidate(self):
+        """Buang entry (dipanggil setelah snapshot baru di-publish di worker ini)"""
+        with self._lock:
+            self._entry = None
+
+    @staticmethod
+    def _recheck_at(entry, now):
+        return min(
+            now + timedelta(seconds=TOP_VIDEOS_CACHE_RECHECK), next_scheduled_fetch(now)
+        )
+
+
+top_videos_response_cache = TopVideosResponseCache()
+
+
+def top_videos_response(req, entry, now):
+    """Response 200/304 dengan ETag, Last-Modified dan Cache-Control sampai fetch berikutnya"""
+    max_age = max(0, int((next_scheduled_fetch(now) - now).total_seconds()))
+    headers = {
+        "ETag": entry["etag"],
+        "Cache-Control": f"public, max-age={max_age}",
+    }
+    if entry["last_modified"] is not None:
+        headers["Last-Modified"] = format_datetime(entry["last_modified"], usegmt=True)
+
+    # If-None-Match lebih diutamakan daripada If-Modified-Since (RFC 9110)
+    if_none_match = req.headers.get("If-None-Match")
+    if_modified_since = req.headers.get("If-Modified-Since")
+    not_modified = False
+    if if_none_match:
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        not_modified = "*" in candidates or entry["etag"] in candidates
+    elif if_modified_since and entry["last_modified"] is not None:
+        try:
+            not_modified = entry["last_modified"].replace(microsecond=0) <= parsedate_to_datetime(
+                if_modified_since
+            )
+        except (TypeError, ValueError):
+            not_modified = False
+
+    if not_modified:
+        return func.HttpResponse(status_code=304, headers=headers)
+
+    return func.HttpResponse(
+        entry["body"], status_code=200, mimetype="application/json", headers=headers
+    )
+
+
 @app.route(route="top-videos", auth_level=func.AuthLevel.ANONYMOUS, methods=["GET"])
 def get_top_videos(req: func.HttpRequest) -> func.HttpResponse:
     """
     API endpoint untuk mengambil top 10 videos dari MongoDB
-    No pagination - returns all videos from top_videos collection (max 10)
-    Output: JSON dengan videos, count, last_updated
+    No pagination - returns all videos from the active top_videos snapshot (max 10)
+    Output: JSON dengan videos, count, last_updated (+ ETag/Last-Modified, 304 jika tidak berubah)
     """
     logging.info("🚀 Get top videos API called")
 
     try:
+        now = datetime.now(timezone.utc)
+
+        # Response cache masih valid - jawab tanpa menyentuh database
+        entry = top_videos_response_cache.get_fresh(now)
+        if entry is not None:
+            return top_videos_response(req, entry, now)
+
         # Connect to MongoDB
         try:
             db = get_database()
-            collection = db["top_videos"]
         except Exception as e:
             # Log error without exposing connection string
             logging.error(f"Database connection error (top-videos endpoint): {str(e)[:100]}")
             return func.HttpResponse(
-                json.dumps({
+                dumps_json({
                     "error": "Database connection failed",
                     "code": "DB_CONNECTION_ERROR"
                 }),
@@ -648,55 +1478,87 @@ def get_top_videos(req: func.HttpRequest) -> func.HttpResponse:
                 mimetype="application/json",
             )
 
-        # Query all documents from top_videos (no sorting/filtering needed)
+        # Ambil snapshot ranking aktif (satu round-trip, tidak pernah kosong saat update)
         try:
-            # Get all documents from top_videos collection
-            raw_videos = list(collection.find({}))
-            
-            logging.info(f"📊 Found {len(raw_videos)} videos in top_videos collection")
-            
-            # Get last_updated timestamp from first video (all should have same timestamp)
-            last_updated = None
-            if raw_videos:
-                last_updated_dt = raw_videos[0].get("last_updated")
-                if last_updated_dt:
-                    if isinstance(last_updated_dt, datetime):
-                        last_updated = last_updated_dt.isoformat()
-                    else:
-                        last_updated = str(last_updated_dt)
-            
-            # Transform documents with error resilience
-            videos = []
-            failed_count = 0
-            for video in raw_videos:
-                try:
-                    transformed = transform_mongo_doc(video)
-                    videos.append(transformed)
-                except Exception as e:
-                    failed_count += 1
-                    logging.warning(f"Failed to transform video {video.get('_id', 'unknown')}: {str(e)[:100]}")
-                    # Continue processing other videos
+            # Payload sudah di-render saat publish - satu projection fetch (version + payload)
+            payload, version, last_updated_dt = load_top_videos_payload(db)
+            entry = top_videos_response_cache.revalidate(version, now)
+            if entry is None:
+                if payload is None:
+                    # Snapshot lama / collection legacy: render per request
+                    raw_videos, version = load_top_videos_snapshot(db)
+                    logging.info(f"📊 Found {len(raw_videos)} videos in current top_videos snapshot")
+                    response_data, last_updated_dt = build_top_videos_payload(raw_videos)
+                    body = dumps_json(response_data)
+                else:
+                    body = payload.encode("utf-8")
 
-            if failed_count > 0:
-                logging.warning(f"Failed to transform {failed_count} out of {len(raw_videos)} documents")
+                entry = top_videos_response_cache.store(version, body, last_updated_dt, now)
 
-            # Response JSON
-            response_data = {
-                "videos": videos,
-                "count": len(videos),
-                "last_updated": last_updated or datetime.now().isoformat(),
-            }
+                logging.info(f"✅ Top videos snapshot {version} loaded")
+
+            return top_videos_response(req, entry, now)
+
+        except Exception as e:
+            logging.error(f"Database query error: {e}")
+            return func.HttpResponse(
+                dumps_json({
+                    "error": "Database query failed",
+                    "code": "DB_QUERY_ERROR"
+                }),
+                status_code=500,
+                mimetype="application/json",
+            )
 
-            logging.info(f"✅ Top videos fetched: {len(videos)} videos")
+    except Exception as e:
+        logging.error(f"General API error: {e}")
+        return func.HttpResponse(
+            dumps_json({"error": "Internal server error"}),
+            status_code=500,
+            mimetype="application/json",
+        )
+
+
+# --- 7. API ENDPOINT UNTUK BROWSE HISTORICAL DATA ---
+@app.route(route="videos", auth_level=func.AuthLevel.ANONYMOUS, methods=["GET"])
+def list_videos(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    API endpoint untuk browse historical_data dengan keyset (cursor) pagination.
+    Query params: sort (engagement_rate|create_time|fetched_at|play_count), order (asc|desc),
+    limit, cursor, fields, author, hashtag, min_engagement, max_engagement, start, end (ISO date)
+    Output: JSON dengan videos, count, next_cursor, has_more
+    """
+    logging.info("🚀 List videos API called")
 
+    try:
+        try:
+            query = build_video_query(req.params)
+        except ValueError as e:
             return func.HttpResponse(
-                json.dumps(response_data), status_code=200, mimetype="application/json"
+                dumps_json({"error": str(e)}),
+                status_code=400,
+                mimetype="application/json",
             )
 
+        try:
+            db = get_database()
+        except Exception as e:
+            logging.error(f"Database connection error (videos endpoint): {str(e)[:100]}")
+            return func.HttpResponse(
+                dumps_json({
+                    "error": "Database connection failed",
+                    "code": "DB_CONNECTION_ERROR"
+                }),
+                status_code=500,
+                mimetype="application/json",
+            )
+
+        try:
+            page = fetch_videos_page(db["historical_data"], query)
         except Exception as e:
             logging.error(f"Database query error: {e}")
             return func.HttpResponse(
-                json.dumps({
+                dumps_json({
                     "error": "Database query failed",
                     "code": "DB_QUERY_ERROR"
                 }),
@@ -704,13 +1566,98 @@ def get_top_videos(req: func.HttpRequest) -> func.HttpResponse:
                 mimetype="application/json",
             )
 
+        logging.info(f"✅ Returned {page['count']} videos (has_more={page['has_more']})")
+        return func.HttpResponse(
+            dumps_json(page), status_code=200, mimetype="application/json"
+        )
+
     except Exception as e:
         logging.error(f"General API error: {e}")
         return func.HttpResponse(
-            json.dumps({"error": "Internal server error"}),
+            dumps_json({"error": "Internal server error"}),
             status_code=500,
             mimetype="application/json",
         )
 
 
+# --- 8. API ENDPOINT UNTUK TRENDING HASHTAGS ---
+HASHTAG_TRENDING_MAX_DAYS = 90
+HASHTAG_TRENDING_MAX_LIMIT = 100
+# hashtag_stats hanya berubah saat ingest, cukup di-cache singkat per worker
+hashtag_trending_cache = LRUCache(
+    maxsize=256, ttl=int(os.environ.get("HASHTAG_TRENDING_CACHE_TTL", "300"))
+)
 
+
+@app.route(route="hashtags/trending", auth_level=func.AuthLevel.ANONYMOUS, methods=["GET"])
+def get_trending_hashtags_endpoint(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    API endpoint untuk top trending hashtags dari materialized hashtag_stats.
+    Query params: days (default 7), limit (default 20), sort (velocity|velocity_change|engagement)
+    Output: JSON dengan hashtags (video_count, mean_engagement, velocity), count, window_days
+    """
+    logging.info("🚀 Trending hashtags API called")
+
+    try:
+        try:
+            days = int(req.params.get("days") or 7)
+            limit = int(req.params.get("limit") or 20)
+        except ValueError:
+            return func.HttpResponse(
+                dumps_json({"error": "Parameters days and limit must be integers"}),
+                status_code=400,
+                mimetype="application/json",
+            )
+        sort = req.params.get("sort") or "velocity"
+        if not 1 <= days <= HASHTAG_TRENDING_MAX_DAYS:
+            return func.HttpResponse(
+                dumps_json({"error": f"Parameter days must be between 1 and {HASHTAG_TRENDING_MAX_DAYS}"}),
+                status_code=400,
+                mimetype="application/json",
+            )
+        if not 1 <= limit <= HASHTAG_TRENDING_MAX_LIMIT:
+            return func.HttpResponse(
+                dumps_json({"error": f"Parameter limit must be between 1 and {HASHTAG_TRENDING_MAX_LIMIT}"}),
+                status_code=400,
+                mimetype="application/json",
+            )
+        if sort not in HASHTAG_TRENDING_SORTS:
+            return func.HttpResponse(
+                dumps_json({"error": f"Parameter sort must be one of: {', '.join(HASHTAG_TRENDING_SORTS)}"}),
+                status_code=400,
+                mimetype="application/json",
+            )
+
+        cache_key = (days, limit, sort)
+        body = hashtag_trending_cache.get(cache_key)
+        if body is None:
+            try:
+                db = get_database()
+                hashtags = get_trending_hashtags(db, days=days, limit=limit, sort=sort)
+            except Exception as e:
+                logging.error(f"Database error (hashtags endpoint): {str(e)[:100]}")
+                return func.HttpResponse(
+                    dumps_json({
+                        "error": "Database query failed",
+                        "code": "DB_QUERY_ERROR"
+                    }),
+                    status_code=500,
+                    mimetype="application/json",
+                )
+            body = dumps_json({
+                "hashtags": hashtags,
+                "count": len(hashtags),
+                "window_days": days,
+                "sort": sort,
+            })
+            hashtag_trending_cache.set(cache_key, body)
+
+        return func.HttpResponse(body, status_code=200, mimetype="application/json")
+
+    except Exception as e:
+        logging.error(f"General API error: {e}")
+        return func.HttpResponse(
+            dumps_json({"error": "Internal server error"}),
+            status_code=500,
+            mimetype="application/json",
+        )
@@ -4,17 +4,19 @@ Run this script once after deploying the new top videos feature.
 
 Usage:
     python migrate_to_top_videos.py
+    python migrate_to_top_videos.py --rollback   # pointer kembali ke snapshot sebelumnya
 """
 
 import os
 import sys
-from pymongo import MongoClient, DESCENDING
+import argparse
+from pymongo import DESCENDING
 import logging
 
 # Add parent directory to path to import function_app
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from function_app import get_database, update_top_videos
+from function_app import get_database, update_top_videos, load_top_videos, rollback_top_videos
 
 logging.basicConfig(
     level=logging.INFO,
@@ -55,6 +57,12 @@ def verify_indexes():
         
         logging.info(f"📋 Existing indexes: {index_names}")
         
+        # historical_data juga butuh index engagement_rate untuk ranking incremental
+        historical_collection = db["historical_data"]
+        if 'engagement_rate_desc' not in [idx['name'] for idx in historical_collection.list_indexes()]:
+            historical_collection.create_index([("engagement_rate", DESCENDING)], name="engagement_rate_desc")
+            logging.info("✅ Created historical_data engagement_rate_desc index")
+        
         required_indexes = ['engagement_rate_desc', 'last_updated_desc']
         missing_indexes = [idx for idx in required_indexes if idx not in index_names]
         
@@ -99,7 +107,8 @@ def run_migration():
     # Step 3: Run initial update_top_videos
     logging.info("\n📋 Step 3: Populating top_videos collection...")
     try:
-        update_top_videos()
+        # Full recompute juga mengisi engagement_rate di dokumen historical_data lama
+        update_top_videos(full_recompute=True)
         logging.info("✅ Successfully populated top_videos collection")
     except Exception as e:
         logging.error(f"❌ Failed to populate top_videos: {e}")
@@ -109,14 +118,14 @@ def run_migration():
     logging.info("\n📋 Step 4: Verifying results...")
     try:
         db = get_database()
-        collection = db["top_videos"]
+        videos = load_top_videos(db)
         
-        count = collection.count_documents({})
-        logging.info(f"📊 top_videos collection now has {count} documents")
+        count = len(videos)
+        logging.info(f"📊 Active top_videos snapshot now has {count} videos")
         
         if count > 0:
             # Show top 3 videos
-            top_3 = list(collection.find().sort("engagement_rate", DESCENDING).limit(3))
+            top_3 = sorted(videos, key=lambda v: v.get("engagement_rate", 0), reverse=True)[:3]
             logging.info("\n🏆 Top 3 videos:")
             for i, video in enumerate(top_3, 1):
                 desc = video.get('description', 'No description')[:50]
@@ -135,9 +144,35 @@ def run_migration():
         logging.error(f"❌ Failed to verify results: {e}")
         return False
 
+def run_rollback():
+    """
+    Kembalikan /api/top-videos ke snapshot sebelumnya (pointer -> previous_version).
+    Instance API lain mengikuti sendiri saat cache-nya revalidate version.
+    """
+    logging.info("⏪ Rolling back top_videos to previous snapshot...")
+    try:
+        version = rollback_top_videos(get_database())
+    except Exception as e:
+        logging.error(f"❌ Rollback failed: {e}")
+        return False
+
+    if version is None:
+        logging.error("❌ Rollback aborted: no previous snapshot available")
+        return False
+
+    logging.info(f"✅ top_videos now serves snapshot {version}")
+    return True
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate / rollback top_videos snapshot")
+    parser.add_argument(
+        "--rollback",
+        action="store_true",
+        help="kembalikan pointer top_videos ke snapshot sebelumnya",
+    )
+    args = parser.parse_args()
     try:
-        success = run_migration()
+        success = run_rollback() if args.rollback else run_migration()
         sys.exit(0 if success else 1)
     except KeyboardInterrupt:
         logging.info("\n⚠️  Migration interrupted by user")
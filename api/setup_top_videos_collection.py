@@ -7,9 +7,21 @@ Usage:
 """
 
 import os
-from pymongo import MongoClient, DESCENDING
+import sys
+from pymongo import DESCENDING
 import logging
 
+# Add parent directory to path to import shared modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from shared.db import db_manager
+from shared.stats_history import ensure_stats_history_collection
+from shared.video_query import ensure_video_indexes
+from shared.hashtag_stats import (
+    HASHTAG_STATS_COLLECTION, ensure_hashtag_stats_indexes, rebuild_hashtag_stats,
+    backfill_hashtags_lc,
+)
+
 logging.basicConfig(level=logging.INFO)
 
 def setup_top_videos_collection():
@@ -17,15 +29,9 @@ def setup_top_videos_collection():
     Create top_videos collection and indexes.
     """
     try:
-        # Get connection string from environment
-        connection_string = os.environ.get("MONGODB_CONNECTION_STRING")
-        if not connection_string:
-            raise ValueError("MONGODB_CONNECTION_STRING environment variable not set")
-        
-        # Connect to MongoDB
+        # Connect to MongoDB (shared pooled client)
         logging.info("Connecting to MongoDB...")
-        client = MongoClient(connection_string)
-        db = client["b4upload_db"]
+        db = db_manager.get_database()
         
         # Create collection (if not exists)
         if "top_videos" not in db.list_collection_names():
@@ -49,6 +55,36 @@ def setup_top_videos_collection():
         indexes = list(collection.list_indexes())
         logging.info(f"📋 Collection indexes: {[idx['name'] for idx in indexes]}")
         
+        # Index on historical_data.engagement_rate untuk ranking top videos
+        # tanpa full scan (engagement_rate disimpan saat upsert)
+        db["historical_data"].create_index([("engagement_rate", DESCENDING)], name="engagement_rate_desc")
+        logging.info("✅ Created index on historical_data.engagement_rate (descending)")
+        
+        # hashtags_lc (ter-normalisasi) untuk dokumen lama - dipakai filter /videos?hashtag=
+        backfilled = backfill_hashtags_lc(db["historical_data"])
+        logging.info(f"✅ Backfilled historical_data.hashtags_lc ({backfilled} documents)")
+        
+        # Compound index (filter, sort, _id) untuk keyset pagination endpoint /videos
+        video_indexes = ensure_video_indexes(db["historical_data"])
+        logging.info(f"✅ Created historical_data indexes for /videos: {video_indexes}")
+        
+        # Hashtag analytics: compound index /videos dengan prefix hashtags_lc sudah multikey
+        # (dipakai juga untuk lookup per hashtag); hashtag_stats di-backfill sekali
+        ensure_hashtag_stats_indexes(db)
+        if db[HASHTAG_STATS_COLLECTION].estimated_document_count() == 0:
+            buckets = rebuild_hashtag_stats(db)
+            logging.info(f"✅ Backfilled hashtag_stats ({buckets} hashtag/day buckets)")
+        else:
+            logging.info("ℹ️  hashtag_stats already populated (maintained incrementally on ingest)")
+        
+        # Snapshot ranking (versioned) - index last_updated untuk retention & rollback
+        db["top_videos_snapshots"].create_index([("last_updated", DESCENDING)], name="last_updated_desc")
+        logging.info("✅ Created index on top_videos_snapshots.last_updated (descending)")
+        
+        # Time-series history stats per video (append-only, satu snapshot per fetch)
+        ensure_stats_history_collection(db)
+        logging.info("✅ Ensured video_stats_history collection and indexes")
+        
         logging.info("✅ Setup completed successfully!")
         
     except Exception as e:
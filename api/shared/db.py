@@ -0,0 +1,127 @@
+import os
+import time
+import logging
+import threading
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+
+DATABASE_NAME = "b4upload_db"
+
+
+def _env_int(name, default):
+    """Baca integer dari environment variable dengan fallback default"""
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        logging.warning(f"Invalid value for {name}, using default {default}")
+        return default
+
+
+class MongoConnectionManager:
+    """Singleton pattern untuk satu MongoClient (connection pool) per worker process"""
+
+    _instance = None
+    _client = None
+    _client_pid = None
+    _last_health_check = 0.0
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(MongoConnectionManager, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        # Lazy startup - client dibuat saat get_client() pertama kali dipanggil
+        pass
+
+    def _create_client(self):
+        """Buat MongoClient baru dengan pool settings dari environment"""
+        connection_string = os.environ.get("MONGODB_CONNECTION_STRING")
+        if not connection_string:
+            logging.error("MONGODB_CONNECTION_STRING environment variable not set")
+            raise ValueError("MongoDB connection string not configured")
+
+        # Log connection attempt without exposing credentials
+        logging.info("Creating pooled MongoDB client...")
+        client = MongoClient(
+            connection_string,
+            maxPoolSize=_env_int("MONGODB_MAX_POOL_SIZE", 10),
+            minPoolSize=_env_int("MONGODB_MIN_POOL_SIZE", 0),
+            maxIdleTimeMS=_env_int("MONGODB_MAX_IDLE_TIME_MS", 300000),
+            serverSelectionTimeoutMS=_env_int("MONGODB_SERVER_SELECTION_TIMEOUT_MS", 5000),
+            connectTimeoutMS=_env_int("MONGODB_CONNECT_TIMEOUT_MS", 10000),
+            retryWrites=True,
+            retryReads=True,
+        )
+        # MongoClient tidak membuka koneksi sampai operasi pertama,
+        # jadi lakukan ping agar error konfigurasi langsung terlihat
+        try:
+            client.admin.command("ping")
+        except Exception:
+            # Tutup client gagal agar pool & monitor thread-nya tidak bocor tiap retry
+            client.close()
+            raise
+        logging.info("MongoDB connection successful")
+        return client
+
+    def get_client(self):
+        """Return shared MongoClient, reconnect jika health check gagal"""
+        with self._lock:
+            # Client tidak aman dipakai setelah fork, buat ulang per process
+            if self._client is not None and self._client_pid != os.getpid():
+                self._client = None
+
+            if self._client is None:
+                self._client = self._create_client()
+                self._client_pid = os.getpid()
+                self._last_health_check = time.monotonic()
+                return self._client
+
+            interval = _env_int("MONGODB_HEALTH_CHECK_INTERVAL", 60)
+            if time.monotonic() - self._last_health_check >= interval:
+                try:
+                    self._client.admin.command("ping")
+                    self._last_health_check = time.monotonic()
+                except PyMongoError as e:
+                    logging.warning(f"MongoDB health check failed, reconnecting: {type(e).__name__}")
+                    self._close_client()
+                    self._client = self._create_client()
+                    self._client_pid = os.getpid()
+                    self._last_health_check = time.monotonic()
+
+            return self._client
+
+    def get_database(self, name=DATABASE_NAME):
+        """Return database handle dari shared client"""
+        return self.get_client()[name]
+
+    def is_healthy(self):
+        """Ping server tanpa membuat client baru"""
+        if self._client is None:
+            return False
+        try:
+            self._client.admin.command("ping")
+            return True
+        except PyMongoError:
+            return False
+
+    def reset(self):
+        """Tutup client saat ini, request berikutnya akan membuat client baru"""
+        with self._lock:
+            self._close_client()
+
+    def _close_client(self):
+        if self._client is not None:
+            try:
+                self._client.close()
+            except Exception as e:
+                logging.warning(f"Error closing MongoDB client: {type(e).__name__}")
+        self._client = None
+        self._client_pid = None
+        self._last_health_check = 0.0
+
+
+# Inisialisasi global connection manager (tapi belum connect)
+db_manager = MongoConnectionManager()
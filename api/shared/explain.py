@@ -0,0 +1,65 @@
+import numpy as np
+
+
+# Urutan kolom sama dengan feature_cols di scripts/train_model.py
+FEATURE_NAMES = [
+    "video_duration",
+    "hashtags_count",
+    "upload_hour",
+    "upload_day",
+    "upload_month",
+    "music_title",
+]
+
+FEATURE_LABELS = {
+    "video_duration": "Video duration",
+    "hashtags_count": "Hashtags count",
+    "upload_hour": "Upload hour",
+    "upload_day": "Upload day",
+    "upload_month": "Upload month",
+    "music_title": "Music",
+}
+
+
+def compute_contributions(model, feature_matrix):
+    """
+    SHAP values per baris & kelas memakai TreeSHAP native LightGBM (pred_contrib),
+    jadi tidak perlu shap.TreeExplainer di runtime. Nilai dalam ruang raw score
+    (log-odds per kelas), kolom terakhir = expected value (base).
+    Returns array shape (n_rows, n_classes, n_features + 1)
+    """
+    feature_matrix = np.asarray(feature_matrix, dtype=np.float64)
+    contributions = model.booster_.predict(feature_matrix, pred_contrib=True)
+    n_rows, width = feature_matrix.shape[0], feature_matrix.shape[1] + 1
+    if contributions.shape[1] == width:
+        # Model biner: satu set kontribusi untuk kelas positif
+        positive = contributions.reshape(n_rows, 1, width)
+        return np.concatenate([-positive, positive], axis=1)
+    return contributions.reshape(n_rows, -1, width)
+
+
+def format_explanation(contributions, class_index, feature_values, label):
+    """
+    Ringkas SHAP values untuk kelas yang diprediksi.
+    Returns (shap_values list terurut |contribution| desc, base_value, insight string)
+    """
+    class_contrib = contributions[class_index]
+    base_value = float(class_contrib[-1])
+    shap_values = [
+        {
+            "feature": name,
+            "value": float(feature_values[i]),
+            "contribution": float(class_contrib[i]),
+        }
+        for i, name in enumerate(FEATURE_NAMES)
+    ]
+    shap_values.sort(key=lambda item: abs(item["contribution"]), reverse=True)
+
+    top = shap_values[:2]
+    parts = [
+        f"{FEATURE_LABELS[item['feature']]} ({'+' if item['contribution'] >= 0 else '-'}"
+        f"{abs(item['contribution']):.2f})"
+        for item in top
+    ]
+    insight = f"{' and '.join(parts)} contribute most to the '{label}' prediction."
+    return shap_values, base_value, insight
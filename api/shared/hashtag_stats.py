@@ -0,0 +1,292 @@
+import logging
+from datetime import datetime, timedelta
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+
+
+# Materialized view: satu dokumen per (hashtag, hari fetch), di-update incremental saat ingest
+HASHTAG_STATS_COLLECTION = "hashtag_stats"
+
+HASHTAG_TRENDING_SORTS = {
+    "velocity": "velocity_per_day",
+    "velocity_change": "velocity_change",
+    "engagement": "mean_engagement",
+}
+
+
+def normalize_hashtag(tag):
+    return tag.strip().lstrip("#").lower()
+
+
+def normalize_hashtags(tags):
+    """
+    Versi ter-normalisasi array hashtags (unik, urut) untuk field hashtags_lc di
+    historical_data, supaya /videos?hashtag= cocok dengan kunci hashtag_stats
+    """
+    normalized = {normalize_hashtag(tag) for tag in tags or []}
+    normalized.discard("")
+    return sorted(normalized)
+
+
+def backfill_hashtags_lc(collection, batch_size=1000):
+    """
+    Isi/perbaiki hashtags_lc untuk dokumen lama (sekali, mis. saat setup). Kunci dihitung
+    di Python dengan normalize_hashtags (bukan $toLower, yang hanya lowercase ASCII) agar
+    sama persis dengan jalur ingest. Returns jumlah dokumen yang di-update
+    """
+    modified = 0
+    operations = []
+    cursor = collection.find({}, {"hashtags": 1, "hashtags_lc": 1})
+    for doc in cursor:
+        hashtags_lc = normalize_hashtags(doc.get("hashtags"))
+        if doc.get("hashtags_lc") == hashtags_lc:
+            continue
+        operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"hashtags_lc": hashtags_lc}}))
+        if len(operations) >= batch_size:
+            modified += collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        modified += collection.bulk_write(operations, ordered=False).modified_count
+    return modified
+
+
+def _day_bucket(value):
+    return datetime(value.year, value.month, value.day)
+
+
+def ensure_hashtag_stats_indexes(db):
+    """Index untuk query trending per window: bucket range lalu group per hashtag"""
+    collection = db[HASHTAG_STATS_COLLECTION]
+    collection.create_index([("bucket", DESCENDING), ("hashtag", ASCENDING)], name="bucket_hashtag")
+    collection.create_index([("hashtag", ASCENDING), ("bucket", DESCENDING)], name="hashtag_bucket")
+    return collection
+
+
+# Field historical_data yang dibutuhkan untuk menghitung increment/delta hashtag_stats
+HASHTAG_STATS_PROJECTION = {
+    "hashtags": 1, "first_seen_at": 1, "fetched_at": 1, "engagement_rate": 1, "stats.play_count": 1,
+}
+
+
+def _first_seen_bucket(video):
+    # Video baru: first_seen_at == fetched_at (first_seen_at ditulis via $setOnInsert)
+    first_seen_at = video.get("first_seen_at") or video.get("fetched_at")
+    if not isinstance(first_seen_at, datetime):
+        return None
+    return _day_bucket(first_seen_at)
+
+
+def _video_totals(video):
+    engagement = video.get("engagement_rate") or 0.0
+    play_count = (video.get("stats") or {}).get("play_count", 0) or 0
+    return engagement, play_count
+
+
+def _add_increment(increments, tag, bucket, video_count, engagement, play_count):
+    entry = increments.setdefault((tag, bucket), {
+        "video_count": 0, "engagement_sum": 0.0, "play_count_sum": 0,
+    })
+    entry["video_count"] += video_count
+    entry["engagement_sum"] += engagement
+    entry["play_count_sum"] += play_count
+
+
+def build_hashtag_increments(videos, increments=None):
+    """
+    Agregasi batch video di memory jadi increment per (hashtag, hari pertama terlihat).
+    Hashtag duplikat dalam satu video hanya dihitung sekali.
+    """
+    increments = {} if increments is None else increments
+    for video in videos:
+        bucket = _first_seen_bucket(video)
+        if bucket is None:
+            continue
+        engagement, play_count = _video_totals(video)
+        for tag in normalize_hashtags(video.get("hashtags")):
+            _add_increment(increments, tag, bucket, 1, engagement, play_count)
+    return increments
+
+
+def build_hashtag_deltas(updates, increments=None):
+    """
+    Koreksi untuk video yang di-fetch ulang: selisih engagement_rate & play_count
+    (baru - sebelumnya) ditambahkan ke bucket tempat video itu dulu dihitung, tanpa
+    menambah video_count. Tanpa ini engagement_sum tertahan di nilai saat pertama
+    terlihat (video baru hampir selalu mendekati 0). `updates` = (previous, video).
+    """
+    increments = {} if increments is None else increments
+    for previous, video in updates:
+        bucket = _first_seen_bucket(previous)
+        if bucket is None:
+            continue
+        old_engagement, old_play_count = _video_totals(previous)
+        new_engagement, new_play_count = _video_totals(video)
+        engagement_delta = new_engagement - old_engagement
+        play_count_delta = new_play_count - old_play_count
+        if not engagement_delta and not play_count_delta:
+            continue
+        # Hashtag tempat video dihitung saat pertama masuk (dokumen sebelum update)
+        for tag in normalize_hashtags(previous.get("hashtags")):
+            _add_increment(increments, tag, bucket, 0, engagement_delta, play_count_delta)
+    return increments
+
+
+def load_hashtag_preimages(collection, videos):
+    """
+    Dokumen historical_data sebelum upsert (satu find per batch via _id), dipakai
+    build_hashtag_deltas. Returns dict _id -> dokumen; video baru tidak ada di dict.
+    """
+    ids = [video["_id"] for video in videos]
+    if not ids:
+        return {}
+    return {
+        doc["_id"]: doc
+        for doc in collection.find({"_id": {"$in": ids}}, HASHTAG_STATS_PROJECTION)
+    }
+
+
+def _increment_operations(increments, now):
+    return [
+        UpdateOne(
+            {"_id": f"{tag}|{bucket:%Y-%m-%d}"},
+            {
+                "$inc": values,
+                "$setOnInsert": {"hashtag": tag, "bucket": bucket},
+                "$max": {"updated_at": now},
+            },
+            upsert=True,
+        )
+        for (tag, bucket), values in increments.items()
+    ]
+
+
+def record_hashtag_stats(db, videos, updates=None):
+    """
+    Tambahkan video yang BARU masuk historical_data ke hashtag_stats ($inc, satu
+    bulk_write per batch). Video yang di-update ulang (`updates`, pasangan
+    (previous, video)) tidak dihitung dua kali, hanya delta engagement & play_count.
+    Returns jumlah bucket (hashtag, hari) yang ter-update.
+    """
+    increments = build_hashtag_increments(videos)
+    build_hashtag_deltas(updates or [], increments)
+    if not increments:
+        return 0
+
+    operations = _increment_operations(increments, datetime.now())
+    try:
+        db[HASHTAG_STATS_COLLECTION].bulk_write(operations, ordered=False)
+        return len(operations)
+    except BulkWriteError as e:
+        failed = len(e.details.get("writeErrors", []))
+        logging.warning(f"Failed to update {failed} hashtag_stats buckets")
+        return len(operations) - failed
+
+
+def backfill_first_seen_at(collection):
+    """
+    Dokumen lama tanpa first_seen_at memakai fetched_at saat ini sebagai pendekatan
+    (sekali, sebelum rebuild), supaya bucket tidak bergeser setiap video di-fetch ulang
+    """
+    result = collection.update_many(
+        {"first_seen_at": {"$exists": False}, "fetched_at": {"$type": "date"}},
+        [{"$set": {"first_seen_at": "$fetched_at"}}],
+    )
+    return result.modified_count
+
+
+def _legacy_engagement(video):
+    # engagement_rate belum ada di dokumen lama: hitung seperti engagement_rate_value
+    if isinstance(video.get("engagement_rate"), (int, float)):
+        return video
+    stats = video.get("stats") or {}
+    play_count = stats.get("play_count", 0)
+    engagement = (stats.get("digg_count", 0) / play_count) * 100 if play_count else 0.0
+    return {**video, "engagement_rate": engagement}
+
+
+def rebuild_hashtag_stats(db, source_collection="historical_data", batch_size=1000):
+    """
+    Backfill penuh hashtag_stats dari historical_data (sekali, mis. saat setup).
+    Setelah itu collection dijaga incremental oleh record_hashtag_stats.
+    """
+    backfill_first_seen_at(db[source_collection])
+    # Agregasi di Python per chunk dengan build_hashtag_increments - kunci hashtag &
+    # bucket identik dengan jalur incremental (normalize_hashtags, hari pertama terlihat)
+    cursor = db[source_collection].find(
+        {"hashtags.0": {"$exists": True}},
+        {**HASHTAG_STATS_PROJECTION, "stats.digg_count": 1},
+        batch_size=batch_size,
+    )
+
+    # Tulis ke collection staging, lalu rename hanya jika hashtag_stats masih kosong
+    staging = db[f"{HASHTAG_STATS_COLLECTION}_rebuild"]
+    staging.drop()
+    now = datetime.now()
+    chunk = []
+
+    def flush():
+        operations = _increment_operations(build_hashtag_increments(chunk), now)
+        if operations:
+            staging.bulk_write(operations, ordered=False)
+        chunk.clear()
+
+    for video in cursor:
+        chunk.append(_legacy_engagement(video))
+        if len(chunk) >= batch_size:
+            flush()
+    flush()
+
+    target = db[HASHTAG_STATS_COLLECTION]
+    if target.count_documents({}, limit=1):
+        # Ingest sudah menulis $inc selama rebuild - jangan timpa hitungan live
+        logging.warning(f"{HASHTAG_STATS_COLLECTION} populated during rebuild, keeping live collection")
+        staging.drop()
+    elif staging.estimated_document_count():
+        staging.rename(HASHTAG_STATS_COLLECTION, dropTarget=True)
+    else:
+        staging.drop()
+    ensure_hashtag_stats_indexes(db)
+    return target.count_documents({})
+
+
+def get_trending_hashtags(db, days=7, limit=20, sort="velocity", now=None):
+    """
+    Top hashtag dalam window `days` hari terakhir, dihitung dari bucket harian
+    hashtag_stats (bukan dari historical_data). Velocity = video baru per hari;
+    velocity_change dibandingkan window sebelumnya dengan panjang yang sama.
+    """
+    sort_field = HASHTAG_TRENDING_SORTS[sort]
+    now = now or datetime.now()
+    window_start = _day_bucket(now) - timedelta(days=days - 1)
+    previous_start = window_start - timedelta(days=days)
+
+    in_window = {"$gte": ["$bucket", window_start]}
+    pipeline = [
+        {"$match": {"bucket": {"$gte": previous_start}}},
+        {"$group": {
+            "_id": "$hashtag",
+            "video_count": {"$sum": {"$cond": [in_window, "$video_count", 0]}},
+            "engagement_sum": {"$sum": {"$cond": [in_window, "$engagement_sum", 0]}},
+            "play_count_sum": {"$sum": {"$cond": [in_window, "$play_count_sum", 0]}},
+            "previous_count": {"$sum": {"$cond": [in_window, 0, "$video_count"]}},
+        }},
+        {"$match": {"video_count": {"$gt": 0}}},
+        {"$project": {
+            "_id": 0,
+            "hashtag": "$_id",
+            "video_count": 1,
+            "play_count_sum": 1,
+            "mean_engagement": {"$divide": ["$engagement_sum", "$video_count"]},
+            "velocity_per_day": {"$divide": ["$video_count", days]},
+            "previous_velocity_per_day": {"$divide": ["$previous_count", days]},
+            "velocity_change": {"$cond": [
+                {"$gt": ["$previous_count", 0]},
+                {"$divide": [{"$subtract": ["$video_count", "$previous_count"]}, "$previous_count"]},
+                None,
+            ]},
+        }},
+        {"$sort": {sort_field: -1, "video_count": -1, "hashtag": 1}},
+        {"$limit": limit},
+    ]
+    return list(db[HASHTAG_STATS_COLLECTION].aggregate(pipeline))
@@ -0,0 +1,199 @@
+import json
+import time
+import queue
+import logging
+import threading
+
+
+# Penanda akhir stream antar stage
+_DONE = object()
+
+
+class StageMetrics:
+    """Counter throughput per stage (item diproses, waktu kerja, error)"""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+
+    def as_dict(self, elapsed):
+        return {
+            "items": self.items,
+            "errors": self.errors,
+            "busy_seconds": round(self.busy_seconds, 4),
+            # Throughput end-to-end (wall clock) dan kapasitas stage saat sibuk
+            "items_per_second": round(self.items / elapsed, 1) if elapsed > 0 else 0.0,
+            "capacity_per_second": (
+                round(self.items / self.busy_seconds, 1) if self.busy_seconds > 0 else 0.0
+            ),
+        }
+
+
+class JsonlSink:
+    """
+    Sink dry-run: tulis batch dokumen ke file JSONL lokal (bukan MongoDB).
+    Return value sama bentuknya dengan upsert_videos_bulk.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write_batch(self, docs):
+        for doc in docs:
+            self._file.write(json.dumps(doc, default=str, ensure_ascii=False))
+            self._file.write("\n")
+        self._file.flush()
+        return {
+            "inserted": len(docs),
+            "modified": 0,
+            "failed": 0,
+            "failed_ids": [],
+            "saved_videos": docs,
+            "inserted_videos": docs,
+        }
+
+    def close(self):
+        self._file.close()
+
+
+def _put(target, item, stop_event):
+    """queue.put yang tetap bisa dibatalkan saat stage lain gagal"""
+    while not stop_event.is_set():
+        try:
+            target.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(source, stop_event):
+    """queue.get yang mengembalikan _DONE saat pipeline dihentikan"""
+    while not stop_event.is_set():
+        try:
+            return source.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def run_ingest_pipeline(pages, transform, write_batch, batch_size=500, queue_size=4,
+                        on_written=None):
+    """
+    Jalankan pipeline streaming: fetch pages -> transform per item -> batch writer.
+
+    Setiap stage berjalan di thread sendiri dan dihubungkan queue berukuran
+    `queue_size`, sehingga stage yang lambat menahan stage sebelumnya
+    (backpressure) dan memory tetap konstan berapapun jumlah item per run.
+
+    Args:
+        pages: iterable/generator list item mentah per page
+        transform: fungsi item mentah -> dokumen bersih (exception = item dilewati)
+        write_batch: fungsi list dokumen -> dict hasil (inserted/modified/failed)
+        on_written: callback opsional dipanggil dengan hasil setiap batch
+
+    Returns dict metrics per stage + total inserted/modified/failed
+    """
+    page_queue = queue.Queue(maxsize=queue_size)
+    doc_queue = queue.Queue(maxsize=queue_size)
+    stop_event = threading.Event()
+    errors = []
+    metrics = {name: StageMetrics(name) for name in ("fetch", "transform", "write")}
+    totals = {"inserted": 0, "modified": 0, "failed": 0}
+
+    def fetch_stage():
+        stage = metrics["fetch"]
+        try:
+            iterator = iter(pages)
+            while not stop_event.is_set():
+                start = time.perf_counter()
+                try:
+                    page = next(iterator)
+                except StopIteration:
+                    break
+                stage.busy_seconds += time.perf_counter() - start
+                stage.items += len(page)
+                if not _put(page_queue, page, stop_event):
+                    break
+        except Exception as e:
+            errors.append(e)
+            stop_event.set()
+        finally:
+            _put(page_queue, _DONE, stop_event)
+
+    def transform_stage():
+        stage = metrics["transform"]
+        try:
+            while True:
+                page = _get(page_queue, stop_event)
+                if page is _DONE:
+                    break
+                start = time.perf_counter()
+                docs = []
+                for item in page:
+                    try:
+                        docs.append(transform(item))
+                    except Exception as e:
+                        stage.errors += 1
+                        logging.warning(f"Gagal memproses item: {e}")
+                stage.busy_seconds += time.perf_counter() - start
+                stage.items += len(docs)
+                if docs and not _put(doc_queue, docs, stop_event):
+                    break
+        except Exception as e:
+            errors.append(e)
+            stop_event.set()
+        finally:
+            _put(doc_queue, _DONE, stop_event)
+
+    def flush(buffer):
+        stage = metrics["write"]
+        start = time.perf_counter()
+        result = write_batch(buffer)
+        stage.busy_seconds += time.perf_counter() - start
+        stage.items += len(buffer) - result.get("failed", 0)
+        stage.errors += result.get("failed", 0)
+        for key in totals:
+            totals[key] += result.get(key, 0)
+        if on_written is not None:
+            on_written(result)
+
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=fetch_stage, name="ingest-fetch", daemon=True),
+        threading.Thread(target=transform_stage, name="ingest-transform", daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    # Writer berjalan di thread pemanggil
+    buffer = []
+    try:
+        while True:
+            docs = _get(doc_queue, stop_event)
+            if docs is _DONE:
+                break
+            buffer.extend(docs)
+            while len(buffer) >= batch_size:
+                flush(buffer[:batch_size])
+                buffer = buffer[batch_size:]
+        if buffer and not errors:
+            flush(buffer)
+    except Exception:
+        stop_event.set()
+        raise
+    finally:
+        for thread in threads:
+            thread.join(timeout=5)
+
+    if errors:
+        raise errors[0]
+
+    elapsed = time.perf_counter() - started
+    report = {name: stage.as_dict(elapsed) for name, stage in metrics.items()}
+    report.update(totals)
+    report["elapsed_seconds"] = round(elapsed, 4)
+    return report
@@ -0,0 +1,13 @@
+import sys
+
+
+def peak_rss_mb():
+    """Peak resident memory process dalam MB (0 jika tidak tersedia)"""
+    try:
+        import resource
+
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux melaporkan KB, macOS melaporkan bytes
+        return rss / 2**20 if sys.platform == "darwin" else rss / 1024
+    except (ImportError, OSError):
+        return 0.0
@@ -0,0 +1,169 @@
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from shared.music_matcher import MusicTitleIndex
+
+
+# Manifest bundle: versi + hash setiap artifact, ditulis terakhir oleh train_model.py
+MODEL_MANIFEST_FILE = "model_manifest.json"
+
+# Judul musik yang dipakai saat input tidak dikenali encoder
+MUSIC_FALLBACK_TITLE = "Original Sound"
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def artifact_hashes(models_dir, file_names):
+    """
+    sha256 per artifact yang ada + versi bundle (hash dari semua hash file).
+    Berbasis isi file, jadi artifact yang sama punya versi yang sama di semua worker.
+    Returns tuple (dict name -> sha256, version)
+    """
+    models_dir = Path(models_dir)
+    files = {
+        name: _file_sha256(models_dir / name)
+        for name in sorted(file_names)
+        if (models_dir / name).exists()
+    }
+    version = hashlib.sha256(
+        "".join(f"{name}:{digest};" for name, digest in files.items()).encode()
+    ).hexdigest()[:12]
+    return files, version
+
+
+def write_model_manifest(models_dir, file_names, extra=None):
+    """
+    Tulis model_manifest.json: sha256 per artifact + versi bundle (hash dari
+    semua hash file). Dipanggil SETELAH semua artifact selesai ditulis, jadi
+    loader tidak pernah memakai campuran artifact lama & baru. Jika hash artifact
+    sama dengan manifest yang ada, manifest tidak ditulis ulang (created_at tetap),
+    sehingga retrain dengan hasil identik tidak menghasilkan perubahan file.
+    """
+    files, version = artifact_hashes(models_dir, file_names)
+    previous = read_model_manifest(models_dir)
+    if previous is not None and previous.get("files") == files:
+        return previous
+    manifest = {
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "files": files,
+        **(extra or {}),
+    }
+    tmp_path = models_dir / f"{MODEL_MANIFEST_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, models_dir / MODEL_MANIFEST_FILE)
+    return manifest
+
+
+def read_model_manifest(models_path):
+    """Return isi manifest, atau None jika bundle belum punya manifest (artifact lama)"""
+    path = Path(models_path) / MODEL_MANIFEST_FILE
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def verify_model_manifest(models_path, manifest, file_names):
+    """Pastikan artifact yang akan di-load sama persis dengan yang tercatat di manifest"""
+    for name in file_names:
+        expected = manifest.get("files", {}).get(name)
+        if expected is None:
+            raise ValueError(f"Artifact {name} not listed in {MODEL_MANIFEST_FILE}")
+        if _file_sha256(Path(models_path) / name) != expected:
+            raise ValueError(f"Artifact {name} does not match {MODEL_MANIFEST_FILE} (partial update?)")
+
+
+class ModelBundle:
+    """
+    Satu set artifact yang konsisten (model + encoders + vocabulary musik + versi).
+    Immutable setelah dibuat: request mengambil satu referensi bundle di awal dan
+    memakainya sampai selesai, jadi reload tidak pernah mencampur dua versi.
+    """
+
+    def __init__(self, model, label_encoder, music_encoder, version, model_format,
+                 load_stats=None, music_match_threshold=0.6):
+        self.model = model
+        self.label_encoder = label_encoder
+        self.music_encoder = music_encoder
+        self.version = version
+        self.format = model_format
+        self.load_stats = load_stats or {}
+        self.music_match_threshold = music_match_threshold
+        self._build_music_vocabulary()
+
+    def _build_music_vocabulary(self):
+        """
+        Precompute dict title -> kode dan n-gram index dari music_encoder.classes_
+        (sekali per load). Kode identik dengan LabelEncoder.transform karena
+        diambil dari posisi di classes_.
+        """
+        titles = [str(title) for title in self.music_encoder.classes_]
+        # Semua class encoder masuk vocabulary exact (termasuk '', ' ', '.') agar paritas
+        # dengan LabelEncoder terjaga; aturan "kosong setelah normalisasi -> fallback"
+        # hanya berlaku di MusicTitleIndex
+        self.music_vocab = {title: code for code, title in enumerate(titles)}
+        # Unknown token: kode "Original Sound", atau 0 jika tidak ada di vocabulary
+        self.music_unknown_code = self.music_vocab.get(MUSIC_FALLBACK_TITLE, 0)
+        # Title yang benar-benar dipakai model untuk kode fallback (None jika vocabulary kosong)
+        self.music_unknown_title = titles[self.music_unknown_code] if titles else None
+        self.music_index = MusicTitleIndex(titles, threshold=self.music_match_threshold)
+
+    def match_music(self, music_title):
+        """
+        Cocokkan music title ke vocabulary encoder: exact lookup O(1) dulu,
+        lalu fuzzy lewat n-gram index. Returns dict code, matched_title, similarity
+        """
+        code = self.music_vocab.get(music_title) if isinstance(music_title, str) else None
+        if code is not None:
+            return {"code": code, "matched_title": music_title, "similarity": 1.0}
+
+        title_id, similarity = self.music_index.lookup(music_title)
+        if title_id is not None and similarity >= self.music_match_threshold:
+            return {
+                "code": title_id,
+                "matched_title": self.music_index.titles[title_id],
+                "similarity": round(similarity, 4),
+            }
+
+        logging.debug(f"Music '{music_title}' not found, using fallback")
+        return {
+            "code": self.music_unknown_code,
+            "matched_title": self.music_unknown_title,
+            "similarity": round(similarity, 4),
+        }
+
+    def encode_music(self, music_title):
+        """Encode music title (exact atau fuzzy match), unknown -> kode fallback"""
+        return self.match_music(music_title)["code"]
+
+    def encode_music_batch(self, music_titles):
+        """Encode banyak music title sekaligus ke array int64 dengan fallback yang sama"""
+        vocab = self.music_vocab
+        # -1 menandai title yang tidak dikenal, diselesaikan lewat fuzzy match
+        codes = np.fromiter(
+            (vocab.get(title, -1) if isinstance(title, str) else -1 for title in music_titles),
+            dtype=np.int64,
+            count=len(music_titles),
+        )
+        unmatched = 0
+        for position in np.flatnonzero(codes < 0):
+            match = self.match_music(music_titles[position])
+            codes[position] = match["code"]
+            unmatched += match["similarity"] < self.music_match_threshold
+        if unmatched:
+            logging.warning(f"{unmatched} of {len(music_titles)} music titles not found, using fallback")
+        return codes
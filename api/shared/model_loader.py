@@ -1,17 +1,64 @@
 import os
+import time
+import hashlib
 import joblib
 import logging
+import threading
 from pathlib import Path
+from shared.native_model import (
+    NATIVE_MODEL_FILE,
+    NATIVE_ENCODERS_FILE,
+    LITE_PICKLE_MODEL_FILE,
+    LITE_NATIVE_MODEL_FILE,
+    load_native_artifacts,
+    NativeBoosterClassifier,
+)
+from shared.tree_engine import compile_model, parity_sample
+from shared.memory import peak_rss_mb
+from shared.model_bundle import (
+    ModelBundle,
+    MODEL_MANIFEST_FILE,
+    artifact_hashes,
+    read_model_manifest,
+    verify_model_manifest,
+)
+
+
+PICKLE_ARTIFACT_FILES = ["b4upload_model.pkl", "label_encoder.pkl", "music_encoder.pkl"]
+NATIVE_ARTIFACT_FILES = [NATIVE_MODEL_FILE, NATIVE_ENCODERS_FILE]
+
+# File model per varian serving: (pickle, native). Encoders selalu sama.
+MODEL_VARIANT_FILES = {
+    "full": ("b4upload_model.pkl", NATIVE_MODEL_FILE),
+    "lite": (LITE_PICKLE_MODEL_FILE, LITE_NATIVE_MODEL_FILE),
+}
+
+# Engine inference: lightgbm (predict_proba asli) | booster (Booster.predict langsung,
+# tanpa validasi wrapper sklearn) | compiled (CompiledTreeEnsemble NumPy)
+MODEL_ENGINE = os.environ.get("MODEL_ENGINE", "lightgbm").lower()
+
+# Interval (detik) watcher mengecek artifact baru; 0 = hot reload dimatikan
+MODEL_RELOAD_INTERVAL = float(os.environ.get("MODEL_RELOAD_INTERVAL", "300"))
 
 
 class ModelLoader:
-    """Singleton pattern untuk loading model ML sekali saja"""
+    """
+    Singleton pattern untuk loading model ML.
+    Model aktif disimpan sebagai satu ModelBundle; reload membangun bundle baru
+    di luar request path lalu menukar referensinya (atomic), request yang sedang
+    berjalan tetap selesai dengan bundle lama.
+    """
 
     _instance = None
-    _model = None
-    _label_encoder = None
-    _music_encoder = None
+    _bundle = None
+    _bundle_fingerprint = None
+    _failed_fingerprint = None
     _models_loaded = False
+    _reload_callbacks = []
+    _load_lock = threading.Lock()
+    _ready = threading.Event()
+    _watcher = None
+    _watcher_stop = threading.Event()
 
     def __new__(cls):
         if cls._instance is None:
@@ -22,87 +69,294 @@ class ModelLoader:
         # Lazy loading - don't load models during initialization
         pass
 
+    @staticmethod
+    def _models_path():
+        """Folder artifact: env MODEL_DIR, default api/models/"""
+        return Path(os.environ.get("MODEL_DIR") or Path(__file__).parent.parent / "models")
+
     def _load_models(self):
-        """Load semua model .pkl dari folder api/models/"""
+        """Load bundle pertama dari folder models (format pickle atau native)"""
         if self._models_loaded:
             return
 
-        try:
-            # Path ke folder models (relatif dari api/)
-            models_path = Path(__file__).parent.parent / "models"
+        with self._load_lock:
+            # Thread lain (mis. warm-up) mungkin sudah selesai load
+            if self._models_loaded:
+                return
 
-            logging.info(f"Loading models from: {models_path}")
+            try:
+                models_path = self._models_path()
+                fingerprint = self._artifact_fingerprint(models_path)
+                self._swap_bundle(self._load_bundle(models_path), fingerprint)
+            except Exception as e:
+                logging.error(f"❌ Failed to load models: {e}")
+                logging.error(f"Error type: {type(e).__name__}")
+                # Don't raise - let it fail gracefully
+                self._models_loaded = False
 
-            # Load main model dengan joblib
-            model_path = models_path / "b4upload_model.pkl"
-            self._model = joblib.load(model_path)
-            logging.info("✅ Main model loaded successfully")
+        if self._models_loaded:
+            self.start_watcher()
+
+    def _load_bundle(self, models_path):
+        """Bangun ModelBundle baru dari disk tanpa menyentuh bundle yang aktif"""
+        model_format = self._resolve_format(models_path)
+        variant = self._resolve_variant(models_path, model_format)
+        pickle_model_file, native_model_file = MODEL_VARIANT_FILES[variant]
+        if model_format == "native":
+            artifact_names = [native_model_file, NATIVE_ENCODERS_FILE]
+        else:
+            artifact_names = [pickle_model_file] + PICKLE_ARTIFACT_FILES[1:]
+        artifact_paths = [models_path / name for name in artifact_names]
+
+        # Bundle dengan manifest diverifikasi hash-nya (tolak artifact setengah ter-update)
+        manifest = read_model_manifest(models_path)
+        if manifest is not None:
+            verify_model_manifest(models_path, manifest, artifact_names)
+
+        logging.info(f"Loading models ({model_format}, {variant}) from: {models_path}")
+        start_time = time.perf_counter()
+        start_rss = peak_rss_mb()
+
+        if model_format == "native":
+            # LightGBM model text + vocabulary JSON, tanpa unpickle sklearn
+            model, label_encoder, music_encoder = load_native_artifacts(
+                models_path, model_file=native_model_file
+            )
+            logging.info("✅ Native model & encoders loaded successfully")
+        else:
+            # Load main model, label encoder & music encoder dengan joblib
+            model, label_encoder, music_encoder = (joblib.load(path) for path in artifact_paths)
+            logging.info("✅ Model & encoders loaded successfully")
+
+        engine = "lightgbm"
+        if MODEL_ENGINE == "booster":
+            if not isinstance(model, NativeBoosterClassifier):
+                model = NativeBoosterClassifier(model.booster_, len(model.classes_))
+            engine = "booster"
+        elif MODEL_ENGINE == "compiled":
+            # Parity check vs predict_proba sebelum dipakai; model tidak didukung
+            # (UnsupportedModelError) atau parity gagal (ValueError) -> tetap LightGBM
+            try:
+                model = compile_model(model, sample=parity_sample(model))
+                engine = "compiled"
+            except ValueError as e:
+                logging.warning(f"Compiled tree engine unavailable, using LightGBM: {e}")
 
-            # Load label encoder
-            label_encoder_path = models_path / "label_encoder.pkl"
-            self._label_encoder = joblib.load(label_encoder_path)
-            logging.info("✅ Label encoder loaded successfully")
+        load_stats = {
+            "format": model_format,
+            "variant": variant,
+            "engine": engine,
+            "load_seconds": round(time.perf_counter() - start_time, 4),
+            "peak_rss_delta_mb": round(peak_rss_mb() - start_rss, 2),
+            "artifact_mb": round(
+                sum(os.path.getsize(path) for path in artifact_paths) / 2**20, 2
+            ),
+        }
+        # Tanpa manifest: versi dari sha256 isi artifact (bukan mtime), sama di semua worker
+        version = manifest["version"] if manifest else artifact_hashes(models_path, artifact_names)[1]
+        bundle = ModelBundle(
+            model,
+            label_encoder,
+            music_encoder,
+            version=version,
+            model_format=model_format,
+            load_stats=load_stats,
+            music_match_threshold=float(os.environ.get("MUSIC_MATCH_THRESHOLD", "0.6")),
+        )
+        logging.info(f"Model version: {version}, load stats: {load_stats}")
+        return bundle
 
-            # Load music encoder
-            music_encoder_path = models_path / "music_encoder.pkl"
-            self._music_encoder = joblib.load(music_encoder_path)
-            logging.info("✅ Music encoder loaded successfully")
+    def _swap_bundle(self, bundle, fingerprint):
+        """Tukar bundle aktif (satu assignment referensi) lalu jalankan reload callbacks"""
+        self._bundle = bundle
+        self._bundle_fingerprint = fingerprint
+        self._models_loaded = True
+        self._ready.set()
+        self._notify_reload()
 
-            self._models_loaded = True
+    @staticmethod
+    def _resolve_format(models_path):
+        """Pilih format artifact dari env MODEL_FORMAT (auto | native | pickle)"""
+        model_format = os.environ.get("MODEL_FORMAT", "auto").lower()
+        if model_format == "auto":
+            native_available = (models_path / NATIVE_MODEL_FILE).exists() and (
+                models_path / NATIVE_ENCODERS_FILE
+            ).exists()
+            return "native" if native_available else "pickle"
+        if model_format not in ("native", "pickle"):
+            logging.warning(f"Unknown MODEL_FORMAT '{model_format}', using pickle")
+            return "pickle"
+        return model_format
 
+    @staticmethod
+    def _resolve_variant(models_path, model_format):
+        """Pilih varian serving dari env MODEL_VARIANT (full | lite), fallback ke full"""
+        variant = os.environ.get("MODEL_VARIANT", "full").lower()
+        if variant not in MODEL_VARIANT_FILES:
+            logging.warning(f"Unknown MODEL_VARIANT '{variant}', using full")
+            return "full"
+        pickle_model_file, native_model_file = MODEL_VARIANT_FILES[variant]
+        model_file = native_model_file if model_format == "native" else pickle_model_file
+        if not (models_path / model_file).exists():
+            logging.warning(f"Model variant '{variant}' not found ({model_file}), using full")
+            return "full"
+        return variant
+
+    @classmethod
+    def _artifact_fingerprint(cls, models_path):
+        """Signature murah (size + mtime) semua artifact & manifest untuk deteksi perubahan"""
+        names = [MODEL_MANIFEST_FILE] + PICKLE_ARTIFACT_FILES + NATIVE_ARTIFACT_FILES + [
+            LITE_PICKLE_MODEL_FILE, LITE_NATIVE_MODEL_FILE,
+        ]
+        return cls._stat_fingerprint(
+            [models_path / name for name in names if (models_path / name).exists()]
+        )
+
+    def reload_if_changed(self, force=False):
+        """
+        Cek artifact di disk; jika berubah, load bundle baru di thread pemanggil
+        (watcher) lalu swap. Gagal load -> bundle lama tetap dipakai.
+        Returns True jika bundle baru dipasang.
+        """
+        models_path = self._models_path()
+        try:
+            fingerprint = self._artifact_fingerprint(models_path)
+        except OSError as e:
+            logging.warning(f"Cannot stat model artifacts: {e}")
+            return False
+        if not force and fingerprint in (self._bundle_fingerprint, self._failed_fingerprint):
+            return False
+
+        try:
+            bundle = self._load_bundle(models_path)
         except Exception as e:
-            logging.error(f"❌ Failed to load models: {e}")
-            logging.error(f"Error type: {type(e).__name__}")
-            # Don't raise - let it fail gracefully
-            self._models_loaded = False
+            # Jangan coba ulang artifact yang sama; dicoba lagi saat file berubah lagi
+            self._failed_fingerprint = fingerprint
+            logging.warning(f"⚠️ Model reload skipped, keeping version {self.get_model_version()}: {e}")
+            return False
 
-    def get_model(self):
-        """Return main prediction model"""
+        with self._load_lock:
+            previous = self._bundle.version if self._bundle else None
+            self._swap_bundle(bundle, fingerprint)
+        logging.info(f"🔄 Model reloaded: {previous} -> {bundle.version}")
+        return True
+
+    def start_watcher(self, interval=None):
+        """Jalankan thread background yang memanggil reload_if_changed secara periodik"""
+        interval = MODEL_RELOAD_INTERVAL if interval is None else interval
+        if interval <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+            return
+
+        def watch():
+            while not self._watcher_stop.wait(interval):
+                try:
+                    self.reload_if_changed()
+                except Exception as e:
+                    logging.warning(f"Model watcher error: {e}")
+
+        ModelLoader._watcher_stop.clear()
+        ModelLoader._watcher = threading.Thread(target=watch, name="model-watcher", daemon=True)
+        ModelLoader._watcher.start()
+
+    def stop_watcher(self):
+        self._watcher_stop.set()
+
+    def warm_up(self, background=True):
+        """Load model lebih awal (saat worker start) agar tidak di request path"""
+        if self._models_loaded:
+            return
+        if background:
+            thread = threading.Thread(
+                target=self._load_models, name="model-warm-up", daemon=True
+            )
+            thread.start()
+        else:
+            self._load_models()
+
+    def is_ready(self):
+        """True jika model sudah selesai di-load"""
+        return self._ready.is_set()
+
+    def wait_until_ready(self, timeout=None):
+        """Tunggu warm-up selesai, return status readiness"""
+        return self._ready.wait(timeout)
+
+    def get_load_stats(self):
+        """Return durasi & memory cold-start dari load terakhir"""
+        return dict(self._bundle.load_stats) if self._bundle else {}
+
+    def register_reload_callback(self, callback):
+        """Daftarkan callback yang dipanggil setiap kali model baru selesai di-load"""
+        self._reload_callbacks.append(callback)
+
+    def _notify_reload(self):
+        """Panggil semua callback (mis. invalidasi cache prediksi)"""
+        for callback in self._reload_callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logging.warning(f"Model reload callback failed: {e}")
+
+    @staticmethod
+    def _stat_fingerprint(paths):
+        """Hash pendek dari ukuran & mtime artifact - hanya untuk deteksi perubahan, bukan versi"""
+        digest = hashlib.sha1()
+        for path in paths:
+            stat = os.stat(path)
+            digest.update(f"{Path(path).name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+        return digest.hexdigest()[:12]
+
+    def get_bundle(self):
+        """
+        Return bundle aktif. Request sebaiknya mengambil bundle SEKALI lalu memakai
+        model/encoder/versi dari referensi yang sama sampai response selesai.
+        """
         if not self._models_loaded:
             self._load_models()
-        if self._model is None:
+        bundle = self._bundle
+        if bundle is None:
             raise RuntimeError("Model not initialized")
-        return self._model
+        return bundle
 
-    def get_label_encoder(self):
-        """Return label encoder"""
+    def get_model_version(self):
+        """Return versi bundle yang sedang dipakai"""
         if not self._models_loaded:
             self._load_models()
-        if self._label_encoder is None:
-            raise RuntimeError("Label encoder not initialized")
-        return self._label_encoder
+        return self._bundle.version if self._bundle else None
+
+    def get_model(self):
+        """Return main prediction model"""
+        return self.get_bundle().model
+
+    def get_label_encoder(self):
+        """Return label encoder"""
+        return self.get_bundle().label_encoder
 
     def get_music_encoder(self):
         """Return music encoder"""
-        if not self._models_loaded:
-            self._load_models()
-        if self._music_encoder is None:
-            raise RuntimeError("Music encoder not initialized")
-        return self._music_encoder
+        return self.get_bundle().music_encoder
+
+    def match_music(self, music_title):
+        """Cocokkan music title ke vocabulary bundle aktif (lihat ModelBundle.match_music)"""
+        return self.get_bundle().match_music(music_title)
 
     def encode_music(self, music_title):
-        """Encode music title dengan fallback handling"""
-        if not self._models_loaded:
-            self._load_models()
-        try:
-            # Coba encode music title
-            return self._music_encoder.transform([music_title])[0]
-        except (ValueError, KeyError):
-            # Fallback ke "Original Sound" jika tidak dikenali
-            try:
-                logging.warning(f"Music '{music_title}' not found, using fallback")
-                return self._music_encoder.transform(["Original Sound"])[0]
-            except:
-                # Ultimate fallback - return modus/default value
-                logging.warning("Using default music encoding value")
-                return 0  # atau nilai default lainnya
+        """Encode music title (exact atau fuzzy match), unknown -> kode fallback"""
+        return self.get_bundle().encode_music(music_title)
+
+    def encode_music_batch(self, music_titles):
+        """Encode banyak music title sekaligus ke array int64 dengan fallback yang sama"""
+        return self.get_bundle().encode_music_batch(music_titles)
 
     def decode_prediction(self, prediction_array):
         """Decode numerical prediction ke label string"""
-        if not self._models_loaded:
-            self._load_models()
-        return self._label_encoder.inverse_transform(prediction_array)
+        return self.get_bundle().label_encoder.inverse_transform(prediction_array)
 
 
-# Inisialisasi global model loader (tapi tidak load models yet)
+# Inisialisasi global model loader
 model_loader = ModelLoader()
+
+# Warm-up opsional saat worker start: MODEL_WARMUP = off | background | sync
+_warmup_mode = os.environ.get("MODEL_WARMUP", "off").lower()
+if _warmup_mode in ("background", "sync"):
+    model_loader.warm_up(background=_warmup_mode == "background")
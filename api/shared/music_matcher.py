@@ -0,0 +1,111 @@
+import re
+import unicodedata
+import numpy as np
+
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize_title(title):
+    """Normalisasi judul musik: NFKC, casefold, buang tanda baca & spasi berlebih"""
+    if not isinstance(title, str):
+        return ""
+    title = unicodedata.normalize("NFKC", title).casefold()
+    return _NON_WORD.sub(" ", title).strip()
+
+
+def title_ngrams(normalized, n=3):
+    """Set character n-gram dari judul yang sudah dinormalisasi (dengan padding spasi)"""
+    if not normalized:
+        return set()
+    padded = f" {normalized} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class MusicTitleIndex:
+    """
+    Inverted index character n-gram untuk mencocokkan judul musik freehand
+    ke judul terdekat di vocabulary encoder (similarity = Dice coefficient).
+
+    Lookup dua tahap: kandidat dipilih dari posting list n-gram yang jarang,
+    lalu skor exact dihitung hanya untuk kandidat tersebut. N-gram umum seperti
+    "sou"/"ori" tidak membuat lookup memindai seluruh vocabulary.
+    """
+
+    def __init__(self, titles, n=3, threshold=0.6, max_candidates=256):
+        self.n = n
+        self.threshold = threshold
+        self.max_candidates = max_candidates
+        self.titles = list(titles)
+        self._exact = {}
+        postings = {}
+        gram_counts = np.zeros(len(self.titles), dtype=np.float64)
+
+        for title_id, title in enumerate(self.titles):
+            normalized = normalize_title(title)
+            # Judul pertama menang jika beberapa judul sama setelah normalisasi;
+            # judul kosong/tanda baca saja tidak boleh jadi target exact match
+            if normalized:
+                self._exact.setdefault(normalized, title_id)
+            grams = title_ngrams(normalized, n)
+            gram_counts[title_id] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(title_id)
+
+        self._gram_counts = gram_counts
+        # Posting list terurut (title_id naik) sehingga bisa di-searchsorted
+        self._postings = {
+            gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()
+        }
+        # N-gram yang muncul di lebih dari ~2% judul dianggap "umum"
+        self._common_df = max(256, len(self.titles) // 50)
+
+    def __len__(self):
+        return len(self.titles)
+
+    def lookup(self, title):
+        """
+        Cari judul terdekat dengan similarity >= threshold. Returns tuple
+        (title_id, similarity), title_id None jika tidak ada yang cukup mirip
+        """
+        normalized = normalize_title(title)
+        if not normalized:
+            # None, angka, "", spasi, tanda baca/emoji saja -> tidak ada match (fallback)
+            return None, 0.0
+        title_id = self._exact.get(normalized)
+        if title_id is not None:
+            return title_id, 1.0
+
+        query_grams = title_ngrams(normalized, self.n)
+        known = [self._postings[g] for g in query_grams if g in self._postings]
+        if not known:
+            return None, 0.0
+
+        rare = [ids for ids in known if len(ids) <= self._common_df]
+        common = [ids for ids in known if len(ids) > self._common_df]
+        if not rare:
+            # Semua n-gram umum - hitung langsung untuk seluruh vocabulary
+            shared = np.bincount(np.concatenate(known), minlength=len(self.titles))
+            candidates = np.flatnonzero(shared)
+            shared = shared[candidates].astype(np.float64)
+        else:
+            # Tahap 1: kandidat dari n-gram jarang, ambil yang paling banyak overlap
+            candidates, shared = np.unique(np.concatenate(rare), return_counts=True)
+            if len(candidates) > self.max_candidates:
+                top = np.argpartition(-shared, self.max_candidates)[: self.max_candidates]
+                candidates, shared = candidates[top], shared[top]
+            shared = shared.astype(np.float64)
+            # Tahap 2: tambahkan overlap n-gram umum secara exact untuk kandidat saja
+            for ids in common:
+                positions = np.minimum(np.searchsorted(ids, candidates), len(ids) - 1)
+                shared += ids[positions] == candidates
+
+        scores = 2.0 * shared / (len(query_grams) + self._gram_counts[candidates])
+        best = int(scores.argmax())
+        best_id, best_score = int(candidates[best]), float(scores[best])
+
+        if best_score < self.threshold:
+            return None, best_score
+        return best_id, best_score
@@ -0,0 +1,82 @@
+import json
+import numpy as np
+
+
+# Nama file artifact format native (tanpa pickle)
+NATIVE_MODEL_FILE = "b4upload_model.txt"
+NATIVE_ENCODERS_FILE = "encoders.json"
+
+# Varian serving ringan (early stopping + num_leaves kecil), lihat scripts/train_model.py
+LITE_PICKLE_MODEL_FILE = "b4upload_model_lite.pkl"
+LITE_NATIVE_MODEL_FILE = "b4upload_model_lite.txt"
+
+
+class VocabularyEncoder:
+    """
+    Pengganti ringan sklearn LabelEncoder yang dibangun dari list classes_.
+    Perilaku transform/inverse_transform sama (unknown label -> ValueError).
+    """
+
+    def __init__(self, classes):
+        self.classes_ = np.asarray(sorted(classes), dtype=object)
+
+    def transform(self, values):
+        classes = self.classes_
+        values = np.asarray(values, dtype=object)
+        positions = np.searchsorted(classes, values)
+        clipped = np.clip(positions, 0, max(len(classes) - 1, 0))
+        if len(classes) == 0 or not np.all(classes[clipped] == values):
+            raise ValueError("y contains previously unseen labels")
+        return clipped.astype(np.int64)
+
+    def inverse_transform(self, codes):
+        return self.classes_[np.asarray(codes, dtype=np.int64)]
+
+
+class NativeBoosterClassifier:
+    """
+    Adapter lightgbm.Booster (model text native) dengan interface
+    predict/predict_proba seperti LGBMClassifier
+    """
+
+    def __init__(self, booster, n_classes):
+        self.booster_ = booster
+        self.classes_ = np.arange(n_classes)
+
+    def predict_proba(self, feature_matrix):
+        probabilities = self.booster_.predict(np.asarray(feature_matrix, dtype=np.float64))
+        if probabilities.ndim == 1:
+            # Model biner: booster hanya mengembalikan probabilitas kelas positif
+            probabilities = np.column_stack([1.0 - probabilities, probabilities])
+        return probabilities
+
+    def predict(self, feature_matrix):
+        return self.classes_[self.predict_proba(feature_matrix).argmax(axis=1)]
+
+
+def export_native_artifacts(model, label_encoder, music_encoder, models_dir):
+    """Simpan model sebagai LightGBM text + vocabulary encoder sebagai JSON"""
+    model.booster_.save_model(f"{models_dir}/{NATIVE_MODEL_FILE}")
+    with open(f"{models_dir}/{NATIVE_ENCODERS_FILE}", "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "label_classes": [str(c) for c in label_encoder.classes_],
+                "music_classes": [str(c) for c in music_encoder.classes_],
+            },
+            f,
+            ensure_ascii=False,
+        )
+
+
+def load_native_artifacts(models_path, model_file=NATIVE_MODEL_FILE):
+    """Load model + encoders dari format native. Returns (model, label_encoder, music_encoder)"""
+    import lightgbm as lgb
+
+    with open(models_path / NATIVE_ENCODERS_FILE, "r", encoding="utf-8") as f:
+        vocab = json.load(f)
+
+    label_encoder = VocabularyEncoder(vocab["label_classes"])
+    music_encoder = VocabularyEncoder(vocab["music_classes"])
+    booster = lgb.Booster(model_file=str(models_path / model_file))
+    model = NativeBoosterClassifier(booster, len(label_encoder.classes_))
+    return model, label_encoder, music_encoder
@@ -0,0 +1,57 @@
+import os
+import json
+import logging
+from datetime import date, datetime
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - tergantung environment deploy
+    orjson = None
+
+
+def _default(obj):
+    """Konversi tipe non-JSON (datetime, numpy) untuk encoder stdlib"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _dumps_stdlib(obj):
+    return json.dumps(obj, default=_default).encode("utf-8")
+
+
+def _dumps_orjson(obj):
+    # orjson langsung menghasilkan bytes, mendukung datetime & numpy secara native
+    return orjson.dumps(
+        obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    )
+
+
+SERIALIZERS = {"stdlib": _dumps_stdlib}
+if orjson is not None:
+    SERIALIZERS["orjson"] = _dumps_orjson
+
+
+def _select_serializer():
+    """Pilih serializer dari env JSON_SERIALIZER (auto | orjson | stdlib)"""
+    name = os.environ.get("JSON_SERIALIZER", "auto").lower()
+    if name == "auto":
+        name = "orjson" if "orjson" in SERIALIZERS else "stdlib"
+    if name not in SERIALIZERS:
+        logging.warning(f"JSON serializer '{name}' not available, using stdlib")
+        name = "stdlib"
+    return name, SERIALIZERS[name]
+
+
+SERIALIZER_NAME, _dumps = _select_serializer()
+
+
+def dumps_json(obj):
+    """Serialize object ke JSON bytes memakai serializer tercepat yang tersedia"""
+    return _dumps(obj)
@@ -0,0 +1,114 @@
+import logging
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError, CollectionInvalid, OperationFailure
+
+
+# Time-series collection: satu snapshot stats per (video_id, fetch), append-only
+STATS_HISTORY_COLLECTION = "video_stats_history"
+
+STATS_FIELDS = ["play_count", "digg_count", "comment_count", "share_count", "collect_count"]
+
+_collection_ready = False
+
+
+def ensure_stats_history_collection(db):
+    """
+    Buat time-series collection + index jika belum ada (sekali per worker).
+    MongoDB < 5.0 tidak mendukung time-series, fallback ke collection biasa.
+    """
+    global _collection_ready
+    if _collection_ready:
+        return db[STATS_HISTORY_COLLECTION]
+
+    if STATS_HISTORY_COLLECTION not in db.list_collection_names():
+        try:
+            db.create_collection(
+                STATS_HISTORY_COLLECTION,
+                timeseries={
+                    "timeField": "fetched_at",
+                    "metaField": "video_id",
+                    "granularity": "hours",
+                },
+            )
+            logging.info(f"✅ Created time-series collection {STATS_HISTORY_COLLECTION}")
+        except CollectionInvalid:
+            # Dibuat oleh worker lain di saat yang sama
+            pass
+        except OperationFailure as e:
+            logging.warning(f"Time-series collection not supported, using regular collection: {e}")
+            db.create_collection(STATS_HISTORY_COLLECTION)
+
+    collection = db[STATS_HISTORY_COLLECTION]
+    # Latest snapshot per video & growth antar fetch: video_id + fetched_at desc
+    collection.create_index(
+        [("video_id", ASCENDING), ("fetched_at", DESCENDING)], name="video_id_fetched_at"
+    )
+    _collection_ready = True
+    return collection
+
+
+def build_stats_snapshot(video):
+    """Snapshot ringkas (field numerik flat) dari dokumen hasil process_video_data"""
+    stats = video.get("stats") or {}
+    snapshot = {"video_id": video["_id"], "fetched_at": video["fetched_at"]}
+    for field in STATS_FIELDS:
+        snapshot[field] = stats.get(field, 0)
+    return snapshot
+
+
+def record_stats_snapshots(db, videos):
+    """
+    Append satu snapshot per video ke history (insert_many unordered, satu round-trip).
+    Returns jumlah snapshot yang tersimpan.
+    """
+    if not videos:
+        return 0
+    collection = ensure_stats_history_collection(db)
+    snapshots = [build_stats_snapshot(video) for video in videos]
+    try:
+        result = collection.insert_many(snapshots, ordered=False)
+        return len(result.inserted_ids)
+    except BulkWriteError as e:
+        failed = len(e.details.get("writeErrors", []))
+        logging.warning(f"Failed to record {failed} stats snapshots")
+        return e.details.get("nInserted", len(snapshots) - failed)
+
+
+def get_latest_snapshots(db, video_ids):
+    """Return dict video_id -> snapshot terbaru (memakai index video_id_fetched_at)"""
+    pipeline = [
+        {"$match": {"video_id": {"$in": list(video_ids)}}},
+        {"$sort": {"video_id": 1, "fetched_at": -1}},
+        {"$group": {"_id": "$video_id", "latest": {"$first": "$$ROOT"}}},
+    ]
+    return {
+        doc["_id"]: doc["latest"]
+        for doc in db[STATS_HISTORY_COLLECTION].aggregate(pipeline)
+    }
+
+
+def get_stats_growth(db, video_id, start, end):
+    """
+    Pertumbuhan stats satu video antara dua waktu fetch: snapshot pertama >= start
+    dan snapshot terakhir <= end. Returns dict delta per field, atau None jika
+    snapshot tidak cukup.
+    """
+    collection = db[STATS_HISTORY_COLLECTION]
+    window = {"video_id": video_id, "fetched_at": {"$gte": start, "$lte": end}}
+    first = collection.find_one(window, sort=[("fetched_at", ASCENDING)])
+    last = collection.find_one(window, sort=[("fetched_at", DESCENDING)])
+    if first is None or last is None or first["_id"] == last["_id"]:
+        return None
+
+    hours = (last["fetched_at"] - first["fetched_at"]).total_seconds() / 3600
+    growth = {
+        "video_id": video_id,
+        "from": first["fetched_at"],
+        "to": last["fetched_at"],
+        "hours": hours,
+    }
+    for field in STATS_FIELDS:
+        delta = last.get(field, 0) - first.get(field, 0)
+        growth[f"{field}_delta"] = delta
+        growth[f"{field}_per_hour"] = delta / hours if hours > 0 else 0.0
+    return growth
@@ -0,0 +1,151 @@
+import os
+import time
+import random
+import logging
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from requests.adapters import HTTPAdapter
+
+
+DEFAULT_TRENDING_URL = "https://tiktok-api23.p.rapidapi.com/api/post/trending"
+
+# Status yang layak di-retry (rate limit & error sementara di sisi server)
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TikTokTrendingClient:
+    """
+    Client HTTP untuk endpoint trending tiktok-api23 dengan session ter-pool
+    (keep-alive), timeout per request, dan retry dengan jittered backoff
+    """
+
+    def __init__(self, url=None, timeout=None, max_retries=None, backoff_base=None,
+                 concurrency=None, session=None, max_backoff=None):
+        self.url = url or os.environ.get("TIKTOK_API_URL", DEFAULT_TRENDING_URL)
+        self.timeout = timeout or float(os.environ.get("TIKTOK_API_TIMEOUT", "15"))
+        self.max_retries = max_retries if max_retries is not None else int(
+            os.environ.get("TIKTOK_API_MAX_RETRIES", "3")
+        )
+        self.backoff_base = backoff_base if backoff_base is not None else float(
+            os.environ.get("TIKTOK_API_BACKOFF_BASE", "0.5")
+        )
+        # Batas atas delay retry (termasuk Retry-After) agar timer function tidak melewati timeout
+        self.max_backoff = max_backoff if max_backoff is not None else float(
+            os.environ.get("TIKTOK_API_MAX_BACKOFF", "30")
+        )
+        self.concurrency = concurrency or int(os.environ.get("TIKTOK_FETCH_CONCURRENCY", "4"))
+        self.headers = {
+            "x-rapidapi-key": os.environ.get("RAPIDAPI_KEY"),
+            "x-rapidapi-host": os.environ.get("RAPIDAPI_HOST"),  # tiktok-api23.p.rapidapi.com
+        }
+        self.session = session or self._create_session()
+
+    def _create_session(self):
+        """Session dengan connection pool seukuran concurrency (keep-alive antar page)"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(self.concurrency, 1))
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _backoff_delay(self, attempt, response=None):
+        """
+        Delay exponential dengan jitter, hormati header Retry-After jika ada.
+        Selalu dibatasi max_backoff (Retry-After besar tidak membuat function timeout)
+        """
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.max_backoff)
+        return min(self.backoff_base * (2 ** attempt) * random.uniform(0.5, 1.5), self.max_backoff)
+
+    def fetch_page(self, count=16, cursor=None):
+        """
+        Ambil satu page trending. Returns dict response JSON (itemList, cursor, hasMore).
+        Raise exception setelah retry habis.
+        """
+        params = {"count": str(count)}
+        if cursor is not None:
+            params["cursor"] = str(cursor)
+
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                response = self.session.get(
+                    self.url, headers=self.headers, params=params, timeout=self.timeout
+                )
+                if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                    delay = self._backoff_delay(attempt, response)
+                    logging.warning(
+                        f"TikTok API status {response.status_code}, retry {attempt + 1} in {delay:.2f}s"
+                    )
+                    time.sleep(delay)
+                    continue
+                response.raise_for_status()
+                return response.json() or {}
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff_delay(attempt)
+                logging.warning(f"TikTok API {type(e).__name__}, retry {attempt + 1} in {delay:.2f}s")
+                time.sleep(delay)
+        return {}
+
+    def iter_trending_pages(self, max_pages=1, count=16):
+        """
+        Generator page trending (list item per page) yang di-yield segera setelah tiba.
+
+        Jika API mengembalikan cursor/hasMore, cursor diikuti secara berurutan.
+        Jika tidak (feed trending biasanya acak per request), page sisanya diambil
+        paralel dengan maksimal `concurrency` request berjalan bersamaan.
+        Video duplikat antar page dibuang.
+        """
+        seen_ids = set()
+        seen_lock = threading.Lock()
+
+        def unique_items(data):
+            items = data.get("itemList") or []
+            fresh = []
+            with seen_lock:
+                for item in items:
+                    video_id = item.get("id") or item.get("video_id")
+                    if video_id in seen_ids:
+                        continue
+                    seen_ids.add(video_id)
+                    fresh.append(item)
+            return fresh
+
+        first = self.fetch_page(count=count)
+        yield unique_items(first)
+        remaining = max_pages - 1
+        if remaining <= 0:
+            return
+
+        cursor = first.get("cursor")
+        if cursor is not None and first.get("hasMore"):
+            # Mode cursor: page berikutnya bergantung pada cursor page sebelumnya
+            while remaining > 0:
+                data = self.fetch_page(count=count, cursor=cursor)
+                yield unique_items(data)
+                remaining -= 1
+                cursor = data.get("cursor")
+                if cursor is None or not data.get("hasMore"):
+                    return
+            return
+
+        # Mode tanpa cursor: page independen, ambil paralel dengan concurrency terbatas.
+        # Maksimal `concurrency` request in-flight; request berikutnya baru dikirim setelah
+        # satu page di-yield, jadi consumer yang lambat (queue penuh) ikut menahan fetch.
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            in_flight = set()
+            while remaining > 0 or in_flight:
+                while remaining > 0 and len(in_flight) < self.concurrency:
+                    in_flight.add(executor.submit(self.fetch_page, count))
+                    remaining -= 1
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        yield unique_items(future.result())
+                    except Exception as e:
+                        logging.error(f"Error fetching trending page: {e}")
@@ -0,0 +1,187 @@
+import logging
+import numpy as np
+
+
+# Kode missing_type per node (sama dengan LightGBM)
+_MISSING_NONE = 0
+_MISSING_ZERO = 1
+_MISSING_NAN = 2
+_MISSING_TYPES = {"None": _MISSING_NONE, "Zero": _MISSING_ZERO, "NaN": _MISSING_NAN}
+
+# kZeroThreshold LightGBM: |x| <= 1e-35 dianggap nol
+_ZERO_THRESHOLD = 1e-35
+
+
+class UnsupportedModelError(ValueError):
+    """Bentuk model (objective / split / mode) yang tidak bisa di-compile engine ini"""
+
+
+class CompiledTreeEnsemble:
+    """
+    Inference engine LightGBM berbasis array NumPy (tanpa wrapper sklearn/LightGBM).
+
+    Semua tree diratakan ke satu set array node global. Leaf disimpan sebagai
+    node "diam" (threshold +inf, kedua child menunjuk dirinya sendiri), jadi
+    traversal semua tree untuk semua baris cukup `max_depth` langkah gather
+    vektor tanpa masking. Interface predict/predict_proba sama dengan LGBMClassifier;
+    `booster_` asli tetap disimpan (dipakai SHAP pred_contrib).
+    """
+
+    def __init__(self, booster):
+        self.booster_ = booster
+        dump = booster.dump_model()
+        self.num_class = int(dump.get("num_class", 1))
+        objective = str(dump.get("objective", ""))
+        if dump.get("average_output"):
+            raise UnsupportedModelError("Random forest mode (average_output) is not supported")
+        self.objective = objective.split()[0] if objective else "regression"
+        self.classes_ = np.arange(max(self.num_class, 2))
+        self._compile(dump["tree_info"])
+
+    def _compile(self, tree_info):
+        features, thresholds, lefts, rights = [], [], [], []
+        default_lefts, missing_types, values = [], [], []
+        roots, max_depth = [], 0
+
+        for tree in tree_info:
+            offset = len(features)
+            # Penomoran node dalam tree ini (internal & leaf) -> index global
+            stack = [(tree["tree_structure"], None, None, 0)]
+            root = None
+            while stack:
+                node, parent, is_left, depth = stack.pop()
+                index = len(features)
+                if parent is None:
+                    root = index
+                elif is_left:
+                    lefts[parent] = index
+                else:
+                    rights[parent] = index
+                max_depth = max(max_depth, depth)
+
+                if "leaf_value" in node or "split_index" not in node:
+                    features.append(0)
+                    thresholds.append(np.inf)
+                    lefts.append(index)
+                    rights.append(index)
+                    default_lefts.append(True)
+                    missing_types.append(_MISSING_NONE)
+                    values.append(float(node.get("leaf_value", 0.0)))
+                    continue
+
+                if node.get("decision_type", "<=") != "<=":
+                    raise UnsupportedModelError("Categorical splits are not supported")
+                features.append(int(node["split_feature"]))
+                thresholds.append(float(node["threshold"]))
+                lefts.append(-1)
+                rights.append(-1)
+                default_lefts.append(bool(node.get("default_left", True)))
+                missing_types.append(_MISSING_TYPES.get(node.get("missing_type", "None"), _MISSING_NONE))
+                values.append(0.0)
+                stack.append((node["right_child"], index, False, depth + 1))
+                stack.append((node["left_child"], index, True, depth + 1))
+
+            roots.append(root if root is not None else offset)
+
+        self.feature = np.asarray(features, dtype=np.intp)
+        self.threshold = np.asarray(thresholds, dtype=np.float64)
+        self.left = np.asarray(lefts, dtype=np.intp)
+        self.right = np.asarray(rights, dtype=np.intp)
+        self.default_left = np.asarray(default_lefts, dtype=bool)
+        self.missing_type = np.asarray(missing_types, dtype=np.int8)
+        self.value = np.asarray(values, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = max_depth
+        self.n_trees = len(roots)
+        self._zero_missing = bool(np.any(self.missing_type == _MISSING_ZERO))
+
+    def raw_score(self, feature_matrix):
+        """Jumlah leaf value per kelas (sama dengan booster.predict(raw_score=True))"""
+        X = np.ascontiguousarray(feature_matrix, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        n_rows = X.shape[0]
+        n_features = X.shape[1]
+        flat = X.ravel()
+        row_offset = (np.arange(n_rows, dtype=np.intp) * n_features)[:, None]
+        node = np.broadcast_to(self.roots, (n_rows, self.n_trees)).copy()
+
+        # Jalur lambat (aturan missing value LightGBM) hanya jika perlu
+        needs_missing = self._zero_missing or bool(np.isnan(X).any())
+
+        for _ in range(self.max_depth):
+            fval = flat[row_offset + self.feature[node]]
+            if needs_missing:
+                missing_type = self.missing_type[node]
+                is_nan = np.isnan(fval)
+                fval = np.where(is_nan & (missing_type != _MISSING_NAN), 0.0, fval)
+                is_missing = ((missing_type == _MISSING_NAN) & is_nan) | (
+                    (missing_type == _MISSING_ZERO) & (np.abs(fval) <= _ZERO_THRESHOLD)
+                )
+                go_left = np.where(is_missing, self.default_left[node], fval <= self.threshold[node])
+            else:
+                go_left = fval <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+
+        leaf_values = self.value[node]
+        # Urutan tree LightGBM: iterasi-major, kelas-minor
+        k = max(self.num_class, 1)
+        return leaf_values.reshape(n_rows, self.n_trees // k, k).sum(axis=1)
+
+    def predict_proba(self, feature_matrix):
+        raw = self.raw_score(feature_matrix)
+        if self.num_class > 1:
+            raw = raw - raw.max(axis=1, keepdims=True)
+            exp = np.exp(raw)
+            return exp / exp.sum(axis=1, keepdims=True)
+        positive = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, feature_matrix):
+        return self.classes_[self.predict_proba(feature_matrix).argmax(axis=1)]
+
+
+def compile_model(model, sample=None, atol=1e-9):
+    """
+    Compile model LightGBM (LGBMClassifier atau NativeBoosterClassifier) ke
+    CompiledTreeEnsemble dan cek parity predict_proba pada `sample`.
+    Raise UnsupportedModelError jika bentuk model tidak didukung, ValueError jika
+    hasil berbeda lebih dari `atol`.
+    """
+    compiled = CompiledTreeEnsemble(model.booster_)
+    if compiled.objective not in ("multiclass", "multiclassova", "binary"):
+        raise UnsupportedModelError(f"Objective {compiled.objective} is not supported")
+    if compiled.objective == "multiclassova":
+        raise UnsupportedModelError("multiclassova objective is not supported")
+
+    if sample is not None:
+        expected = model.predict_proba(sample)
+        actual = compiled.predict_proba(sample)
+        max_diff = float(np.max(np.abs(expected - actual)))
+        if max_diff > atol:
+            raise ValueError(f"Compiled model parity check failed (max diff {max_diff:.3g})")
+        logging.info(f"✅ Compiled tree engine parity OK (max diff {max_diff:.3g})")
+    return compiled
+
+
+def parity_sample(model, n_rows=256, seed=0):
+    """Sample fitur acak dalam rentang threshold model untuk parity check saat load"""
+    booster = model.booster_
+    rng = np.random.default_rng(seed)
+    n_features = booster.num_feature()
+    sample = np.empty((n_rows, n_features), dtype=np.float64)
+    dump = booster.dump_model()
+    bounds = [[0.0, 1.0] for _ in range(n_features)]
+    for tree in dump["tree_info"]:
+        stack = [tree["tree_structure"]]
+        while stack:
+            node = stack.pop()
+            if "split_index" not in node:
+                continue
+            low, high = bounds[node["split_feature"]]
+            threshold = float(node["threshold"])
+            bounds[node["split_feature"]] = [min(low, threshold), max(high, threshold)]
+            stack.extend((node["left_child"], node["right_child"]))
+    for column, (low, high) in enumerate(bounds):
+        sample[:, column] = np.round(rng.uniform(low - 1, high + 1, n_rows))
+    return sample
@@ -0,0 +1,225 @@
+import math
+import base64
+from datetime import datetime, timezone
+
+from bson import ObjectId, json_util
+from pymongo import ASCENDING, DESCENDING
+
+from shared.hashtag_stats import normalize_hashtag
+
+
+# Field sort yang diizinkan -> path di dokumen historical_data
+VIDEOS_SORT_FIELDS = {
+    "engagement_rate": "engagement_rate",
+    "create_time": "create_time",
+    "fetched_at": "fetched_at",
+    "play_count": "stats.play_count",
+}
+
+# Field yang boleh diminta lewat ?fields= (projection)
+VIDEOS_PROJECTABLE_FIELDS = [
+    "video_id", "author_username", "author_nickname", "author_id", "author_followers",
+    "author_verified", "description", "hashtags", "hashtags_count", "create_time",
+    "video_duration", "stats", "engagement_rate", "music_title", "fetched_at",
+]
+
+VIDEOS_DEFAULT_FIELDS = [
+    "video_id", "author_username", "description", "hashtags", "create_time",
+    "stats", "engagement_rate", "music_title", "fetched_at",
+]
+
+VIDEOS_DEFAULT_LIMIT = 50
+VIDEOS_MAX_LIMIT = 200
+
+# Compound index untuk keyset pagination: (filter equality, sort field, _id).
+# _id sebagai tie-breaker membuat urutan total, jadi cursor selalu unik.
+VIDEOS_INDEXES = [
+    ([("engagement_rate", DESCENDING), ("_id", DESCENDING)], "engagement_rate_id"),
+    ([("create_time", DESCENDING), ("_id", DESCENDING)], "create_time_id"),
+    ([("fetched_at", DESCENDING), ("_id", DESCENDING)], "fetched_at_id"),
+    ([("stats.play_count", DESCENDING), ("_id", DESCENDING)], "play_count_id"),
+    ([("author_username", ASCENDING), ("engagement_rate", DESCENDING), ("_id", DESCENDING)],
+     "author_engagement_rate_id"),
+    ([("author_username", ASCENDING), ("create_time", DESCENDING), ("_id", DESCENDING)],
+     "author_create_time_id"),
+    # Filter hashtag memakai hashtags_lc (lowercase, sama dengan kunci hashtag_stats)
+    ([("hashtags_lc", ASCENDING), ("engagement_rate", DESCENDING), ("_id", DESCENDING)],
+     "hashtags_lc_engagement_rate_id"),
+    ([("hashtags_lc", ASCENDING), ("create_time", DESCENDING), ("_id", DESCENDING)],
+     "hashtags_lc_create_time_id"),
+]
+
+
+def ensure_video_indexes(collection):
+    """Buat compound index untuk /videos di historical_data (idempotent)"""
+    for keys, name in VIDEOS_INDEXES:
+        collection.create_index(keys, name=name)
+    return [name for _, name in VIDEOS_INDEXES]
+
+
+def encode_cursor(sort_value, doc_id):
+    """Cursor opaque: posisi (sort value, _id) dokumen terakhir di page"""
+    raw = json_util.dumps([sort_value, doc_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Decode cursor dari client. Nilai dipakai langsung di query, jadi hanya skalar yang
+    diterima (bukan dokumen operator seperti {"$ne": null} / {"$where": ...}):
+    sort value number/str/datetime, _id str (video id) atau ObjectId
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, doc_id = json_util.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    valid_value = isinstance(sort_value, (int, float, str, datetime)) and not isinstance(sort_value, bool)
+    if not valid_value or not isinstance(doc_id, (str, ObjectId)):
+        raise ValueError("Invalid cursor")
+    return sort_value, doc_id
+
+
+def _parse_number(params, name):
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"Parameter {name} must be a number")
+    # "nan"/"inf" lolos float() tapi menghasilkan filter yang tidak pernah cocok
+    if not math.isfinite(number):
+        raise ValueError(f"Parameter {name} must be a number")
+    return number
+
+
+def _parse_date(params, name):
+    """ISO date/datetime -> unix timestamp (create_time disimpan dalam detik)"""
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Parameter {name} must be an ISO date")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def _get_path(doc, path):
+    for key in path.split("."):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(key)
+    return doc
+
+
+def build_video_query(params):
+    """
+    Terjemahkan query params /videos jadi (filter, sort, projection, limit, sort_path).
+    Raise ValueError untuk parameter yang tidak valid (-> HTTP 400).
+    """
+    sort_name = params.get("sort") or "engagement_rate"
+    if sort_name not in VIDEOS_SORT_FIELDS:
+        raise ValueError(f"Parameter sort must be one of: {', '.join(VIDEOS_SORT_FIELDS)}")
+    sort_path = VIDEOS_SORT_FIELDS[sort_name]
+
+    order = (params.get("order") or "desc").lower()
+    if order not in ("asc", "desc"):
+        raise ValueError("Parameter order must be 'asc' or 'desc'")
+    direction = ASCENDING if order == "asc" else DESCENDING
+
+    try:
+        limit = int(params.get("limit") or VIDEOS_DEFAULT_LIMIT)
+    except ValueError:
+        raise ValueError("Parameter limit must be an integer")
+    if not 1 <= limit <= VIDEOS_MAX_LIMIT:
+        raise ValueError(f"Parameter limit must be between 1 and {VIDEOS_MAX_LIMIT}")
+
+    fields = params.get("fields")
+    fields = [f.strip() for f in fields.split(",") if f.strip()] if fields else VIDEOS_DEFAULT_FIELDS
+    unknown = [f for f in fields if f not in VIDEOS_PROJECTABLE_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    projection = {field: 1 for field in fields}
+
+    # Dokumen tanpa nilai sort tidak punya posisi keyset yang jelas -> dilewati
+    conditions = [{sort_path: {"$ne": None}}]
+
+    if params.get("author"):
+        conditions.append({"author_username": params["author"]})
+    if params.get("hashtag"):
+        conditions.append({"hashtags_lc": normalize_hashtag(params["hashtag"])})
+
+    engagement_range = {}
+    min_er = _parse_number(params, "min_engagement")
+    max_er = _parse_number(params, "max_engagement")
+    if min_er is not None:
+        engagement_range["$gte"] = min_er
+    if max_er is not None:
+        engagement_range["$lte"] = max_er
+    if engagement_range:
+        conditions.append({"engagement_rate": engagement_range})
+
+    created_range = {}
+    start = _parse_date(params, "start")
+    end = _parse_date(params, "end")
+    if start is not None:
+        created_range["$gte"] = start
+    if end is not None:
+        created_range["$lte"] = end
+    if created_range:
+        conditions.append({"create_time": created_range})
+
+    # Keyset: lanjut setelah (sort value, _id) terakhir, bukan skip(n)
+    if params.get("cursor"):
+        last_value, last_id = decode_cursor(params["cursor"])
+        op = "$gt" if direction == ASCENDING else "$lt"
+        conditions.append({
+            "$or": [
+                {sort_path: {op: last_value}},
+                {sort_path: last_value, "_id": {op: last_id}},
+            ]
+        })
+
+    query = conditions[0] if len(conditions) == 1 else {"$and": conditions}
+    sort = [(sort_path, direction), ("_id", direction)]
+    return query, sort, projection, limit, sort_path
+
+
+def fetch_videos_page(collection, video_query):
+    """
+    Ambil satu page dari historical_data dengan keyset pagination.
+    `video_query` adalah hasil build_video_query.
+    Returns dict {videos, count, next_cursor, has_more}.
+    """
+    query, sort, projection, limit, sort_path = video_query
+    # Projection selalu menyertakan field sort agar cursor bisa dibentuk
+    # (tanpa path collision jika parent-nya sudah diproyeksikan, mis. stats)
+    top_level_sort = sort_path.split(".")[0]
+    find_projection = dict(projection)
+    if top_level_sort not in projection:
+        find_projection[sort_path] = 1
+
+    # Ambil limit + 1 untuk mengetahui ada page berikutnya tanpa count()
+    docs = list(collection.find(query, find_projection).sort(sort).limit(limit + 1))
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+
+    next_cursor = None
+    if has_more and docs:
+        last = docs[-1]
+        next_cursor = encode_cursor(_get_path(last, sort_path), last["_id"])
+
+    if top_level_sort not in projection:
+        for doc in docs:
+            doc.pop(top_level_sort, None)
+
+    return {
+        "videos": docs,
+        "count": len(docs),
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+    }
@@ -0,0 +1,109 @@
+"""
+Benchmark ingest trending (paginated + concurrent) terhadap mock server lokal.
+Mock server meniru endpoint tiktok-api23 /api/post/trending dengan latency dan
+rate limit (429) buatan, jadi tidak memakai kuota RapidAPI.
+
+Usage:
+    python scripts/benchmark_ingest.py [--pages 50] [--count 30] [--latency 0.2] [--error-rate 0.05]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import itertools
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Pakai client yang sama dengan API (api/shared)
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api")
+)
+from shared.tiktok_client import TikTokTrendingClient
+
+
+_video_ids = itertools.count()
+
+
+def fake_item():
+    video_id = str(next(_video_ids))
+    return {
+        "id": video_id,
+        "desc": f"video {video_id} #fyp #viral",
+        "createTime": int(time.time()),
+        "author": {"uniqueId": f"user{video_id}", "stats": {"followerCount": 100}},
+        "stats": {"playCount": 1000, "diggCount": random.randint(0, 300)},
+        "music": {"title": "Original Sound"},
+        "video": {"duration": random.randint(5, 120)},
+    }
+
+
+def start_mock_server(latency, error_rate, use_cursor):
+    """Jalankan mock server di thread background. Returns (server, url)"""
+
+    class TrendingHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            if random.random() < error_rate:
+                self.send_response(429)
+                self.send_header("Retry-After", "0")
+                self.end_headers()
+                return
+
+            query = parse_qs(urlparse(self.path).query)
+            count = int(query.get("count", ["16"])[0])
+            cursor = int(query.get("cursor", ["0"])[0])
+            body = {"itemList": [fake_item() for _ in range(count)]}
+            if use_cursor:
+                body.update({"cursor": cursor + count, "hasMore": True})
+
+            payload = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TrendingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api/post/trending"
+
+
+def run(url, pages, count, concurrency):
+    client = TikTokTrendingClient(url=url, concurrency=concurrency, backoff_base=0.05)
+    videos = 0
+    start = time.perf_counter()
+    for page in client.iter_trending_pages(max_pages=pages, count=count):
+        videos += len(page)  # Sink: cukup dihitung (tanpa DB)
+    elapsed = time.perf_counter() - start
+    return videos, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--count", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    print(f"{'mode':<10} {'workers':>8} {'videos':>8} {'seconds':>9} {'videos/s':>10}")
+    for use_cursor in (True, False):
+        server, url = start_mock_server(args.latency, args.error_rate, use_cursor)
+        try:
+            for concurrency in ((1,) if use_cursor else (1, 4, 8)):
+                videos, elapsed = run(url, args.pages, args.count, concurrency)
+                mode = "cursor" if use_cursor else "parallel"
+                print(f"{mode:<10} {concurrency:>8} {videos:>8} {elapsed:>9.2f} {videos / elapsed:>10.1f}")
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark cold-start loading model per format artifact (pickle vs native).
+Setiap format dijalankan di subprocess baru agar import lightgbm/sklearn ikut terukur.
+Artifact pickle dari api/models disalin ke MODEL_DIR sementara dan artifact native
+di-export dari pickle yang sama, jadi kedua format selalu bisa dibandingkan.
+
+Usage:
+    python scripts/benchmark_model_loading.py [--runs 5]
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+import joblib
+
+
+API_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api")
+sys.path.insert(0, API_DIR)
+from shared.native_model import export_native_artifacts
+from shared.model_loader import PICKLE_ARTIFACT_FILES
+
+# Dijalankan di dalam subprocess: ukur import + load sampai model siap dipakai
+CHILD_SCRIPT = """
+import json, time
+start = time.perf_counter()
+from shared.model_loader import model_loader
+model_loader.get_model()
+stats = model_loader.get_load_stats()
+stats["total_seconds"] = round(time.perf_counter() - start, 4)
+print(json.dumps(stats))
+"""
+
+
+def prepare_model_dir(source_dir, target_dir):
+    """Salin artifact pickle lalu export versi native-nya ke target_dir"""
+    for name in PICKLE_ARTIFACT_FILES:
+        shutil.copy2(os.path.join(source_dir, name), os.path.join(target_dir, name))
+    model = joblib.load(os.path.join(target_dir, "b4upload_model.pkl"))
+    label_encoder = joblib.load(os.path.join(target_dir, "label_encoder.pkl"))
+    music_encoder = joblib.load(os.path.join(target_dir, "music_encoder.pkl"))
+    export_native_artifacts(model, label_encoder, music_encoder, target_dir)
+
+
+def run_once(model_format, model_dir):
+    env = dict(os.environ, MODEL_FORMAT=model_format, MODEL_WARMUP="off", MODEL_DIR=model_dir)
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT],
+        cwd=API_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def report(model_dir, runs):
+    print(f"{'format':<8} {'total_s':>9} {'load_s':>9} {'peak_rss_mb':>12} {'artifact_mb':>12}")
+    for model_format in ("pickle", "native"):
+        try:
+            results = [run_once(model_format, model_dir) for _ in range(runs)]
+        except (subprocess.CalledProcessError, ValueError, IndexError) as e:
+            print(f"{model_format:<8} gagal: {e}")
+            continue
+        if any(r.get("format") != model_format for r in results):
+            print(f"{model_format:<8} artifact tidak tersedia")
+            continue
+        print(
+            f"{model_format:<8} "
+            f"{statistics.median(r['total_seconds'] for r in results):>9.4f} "
+            f"{statistics.median(r['load_seconds'] for r in results):>9.4f} "
+            f"{statistics.median(r['peak_rss_delta_mb'] for r in results):>12.2f} "
+            f"{results[0]['artifact_mb']:>12.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--source-dir", default=os.path.join(API_DIR, "models"),
+                        help="folder artifact pickle hasil train_model.py")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        prepare_model_dir(args.source_dir, model_dir)
+        report(model_dir, args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark latency lookup MusicTitleIndex (n-gram fuzzy matching) terhadap ukuran vocabulary.
+Vocabulary sintetis dibuat mirip judul TikTok ("original sound - <user>", judul lagu, dll).
+
+Usage:
+    python scripts/benchmark_music_matcher.py [--sizes 1000 10000 100000] [--queries 2000]
+"""
+
+import os
+import sys
+import time
+import random
+import string
+import argparse
+import numpy as np
+
+# Pakai index yang sama dengan API (api/shared)
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api")
+)
+from shared.music_matcher import MusicTitleIndex
+
+
+COMMON_WORDS = [
+    "love", "night", "dance", "remix", "sped", "up", "slowed", "viral", "sound",
+    "summer", "baby", "heart", "dj", "version", "cinta", "rindu", "kita", "lagu",
+]
+
+
+def make_word_pool(rng, size=5000):
+    """Kata acak (nama lagu/artis) + kata umum yang sering muncul di judul"""
+    pool = [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9)))
+        for _ in range(size)
+    ]
+    return pool, COMMON_WORDS
+
+
+def random_title(rng, words):
+    pool, common = words
+    if rng.random() < 0.4:
+        user = "".join(rng.choices(string.ascii_lowercase + string.digits, k=rng.randint(5, 12)))
+        return f"original sound - {user}"
+    title = rng.choices(pool, k=rng.randint(1, 3)) + rng.choices(common, k=rng.randint(0, 2))
+    rng.shuffle(title)
+    return " ".join(title).title()
+
+
+def perturb(title, rng):
+    """Simulasi input user: casing acak, spasi berlebih, typo satu karakter"""
+    chars = list(title.upper() if rng.random() < 0.5 else title.lower())
+    if len(chars) > 3:
+        position = rng.randrange(len(chars))
+        chars[position] = rng.choice(string.ascii_lowercase)
+    return "  " + "".join(chars).replace(" ", "  ") + " "
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    words = make_word_pool(rng)
+    print(f"{'titles':>8} {'build_s':>9} {'p50_us':>9} {'p99_us':>9} {'hit_rate':>9}")
+    for size in args.sizes:
+        titles = sorted({random_title(rng, words) for _ in range(size)})
+
+        start = time.perf_counter()
+        index = MusicTitleIndex(titles)
+        build_seconds = time.perf_counter() - start
+
+        targets = rng.choices(range(len(titles)), k=args.queries)
+        latencies = []
+        hits = 0
+        for target in targets:
+            query = perturb(titles[target], rng)
+            start = time.perf_counter()
+            title_id, _ = index.lookup(query)
+            latencies.append((time.perf_counter() - start) * 1e6)
+            hits += title_id is not None and titles[title_id].lower() == titles[target].lower()
+
+        print(
+            f"{len(titles):>8} {build_seconds:>9.3f} "
+            f"{np.percentile(latencies, 50):>9.1f} {np.percentile(latencies, 99):>9.1f} "
+            f"{hits / len(targets):>9.2%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark pipeline ingest streaming (fetch -> process_video_data -> batch writer)
+secara offline: sumber data dari mock server lokal, hasil ditulis ke sink JSONL.
+Menampilkan throughput per stage dan peak memory (tracemalloc) per ukuran run,
+untuk memastikan memory tetap datar walaupun jumlah item bertambah.
+
+Usage:
+    python scripts/benchmark_pipeline.py [--pages 10 100 500] [--count 30]
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+import tracemalloc
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(SCRIPTS_DIR), "api"))
+sys.path.insert(0, SCRIPTS_DIR)
+
+from benchmark_ingest import start_mock_server
+from function_app import process_video_data
+from shared.ingest_pipeline import run_ingest_pipeline, JsonlSink
+from shared.tiktok_client import TikTokTrendingClient
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--count", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, url = start_mock_server(args.latency, error_rate=0.0, use_cursor=True)
+    print(
+        f"{'pages':>6} {'videos':>8} {'seconds':>8} {'videos/s':>9} {'fetch_cap/s':>12} "
+        f"{'transform_cap/s':>16} {'write_cap/s':>12} {'peak_mb':>8}"
+    )
+    try:
+        for pages in args.pages:
+            client = TikTokTrendingClient(url=url, concurrency=1)
+            with tempfile.TemporaryDirectory() as tmp:
+                sink = JsonlSink(os.path.join(tmp, "ingest.jsonl"))
+                tracemalloc.start()
+                report = run_ingest_pipeline(
+                    client.iter_trending_pages(max_pages=pages, count=args.count),
+                    transform=process_video_data,
+                    write_batch=sink.write_batch,
+                    batch_size=args.batch_size,
+                )
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                sink.close()
+
+            print(
+                f"{pages:>6} {report['write']['items']:>8} {report['elapsed_seconds']:>8.2f} "
+                f"{report['write']['items_per_second']:>9.1f} "
+                f"{report['fetch']['capacity_per_second']:>12.1f} "
+                f"{report['transform']['capacity_per_second']:>16.1f} "
+                f"{report['write']['capacity_per_second']:>12.1f} {peak / 2**20:>8.2f}"
+            )
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
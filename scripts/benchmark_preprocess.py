@@ -0,0 +1,148 @@
+"""
+Benchmark preprocess_data (vectorized) vs implementasi lama berbasis apply pada
+DataFrame sintetis berbentuk output training_loader. Untuk setiap ukuran yang
+menjalankan versi lama, output keduanya dicek identik (pd.testing.assert_frame_equal).
+
+Usage:
+    python scripts/benchmark_preprocess.py [--rows 10000 100000 1000000 10000000] [--max-legacy-rows 1000000]
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from train_model import preprocess_data
+
+
+# --- Implementasi lama (referensi untuk cek output identik) ---
+# Salinan verbatim preprocess_data baseline (jangan diubah). Input benchmark berbentuk
+# output training_loader (stats sudah flat), jadi cabang flatten stats tidak terpakai.
+def extract_hashtags_count_legacy(text):
+    if not isinstance(text, str):
+        return 0
+    return len(re.findall(r"#\w+", text))
+
+
+def preprocess_data_legacy(df):
+    if "stats" in df.columns and not df.empty and isinstance(df.iloc[0]["stats"], dict):
+        stats_df = pd.json_normalize(df["stats"])
+        df = pd.concat([df.drop(["stats"], axis=1), stats_df], axis=1)
+
+    cols_to_numeric = ["play_count", "digg_count", "comment_count", "share_count", "video_duration"]
+    for col in cols_to_numeric:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+
+    df["play_count"] = df["play_count"].replace(0, 1)
+    df["engagement_rate"] = (
+        df["digg_count"] + df["comment_count"] + df["share_count"]
+    ) / df["play_count"]
+    df["engagement_rate"] = df["engagement_rate"].replace([np.inf, -np.inf], np.nan)
+    df.dropna(subset=["engagement_rate"], inplace=True)
+
+    def label_eng(rate):
+        if rate < 0.02:
+            return "rendah"
+        elif rate < 0.06:
+            return "sedang"
+        else:
+            return "tinggi"
+
+    df["engagement_label"] = df["engagement_rate"].apply(label_eng)
+
+    if "hashtags_count" not in df.columns:
+        if "description" in df.columns:
+            df["hashtags_count"] = df["description"].apply(extract_hashtags_count_legacy)
+        else:
+            df["hashtags_count"] = 0
+
+    if "create_time" in df.columns:
+        df["upload_datetime"] = pd.to_datetime(df["create_time"], unit="s")
+    else:
+        df["upload_datetime"] = pd.to_datetime(datetime.now())
+
+    df["upload_hour"] = df["upload_datetime"].dt.hour
+    df["upload_day"] = df["upload_datetime"].dt.dayofweek
+    df["upload_month"] = df["upload_datetime"].dt.month
+
+    if "music_title" not in df.columns:
+        df["music_title"] = "Original Sound"
+    df["music_title"] = df["music_title"].astype(str).fillna("Original Sound")
+    return df
+
+
+def synthetic_frame(rows, seed=0):
+    """
+    DataFrame mirip output training_loader (TRAINING_PROJECTION): stats sudah flat,
+    description dengan hashtag (hashtags_count dihitung oleh preprocess_data)
+    """
+    rng = np.random.default_rng(seed)
+    plays = rng.integers(0, 200_000, rows)
+    likes = (plays * rng.uniform(0, 0.12, rows)).astype(np.int64)
+    tag_counts = rng.integers(0, 6, rows)
+    descriptions = np.array(
+        [" ".join(["video"] + [f"#tag{j}" for j in range(k)]) for k in range(6)], dtype=object
+    )[tag_counts]
+    descriptions[rng.random(rows) < 0.01] = None
+    return pd.DataFrame({
+        "video_id": np.arange(rows).astype(str),
+        "description": descriptions,
+        "create_time": 1_700_000_000 + rng.integers(0, 30_000_000, rows),
+        "video_duration": rng.integers(5, 180, rows),
+        "music_title": rng.choice(["Original Sound", "song a", "song b", None], rows),
+        "play_count": plays,
+        "digg_count": likes,
+        "comment_count": rng.integers(0, 500, rows),
+        "share_count": rng.integers(0, 200, rows),
+    })
+
+
+def timed(fn, df):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(df.copy())
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--max-legacy-rows", type=int, default=1_000_000,
+                        help="versi lama (lambat) hanya dijalankan sampai ukuran ini")
+    args = parser.parse_args()
+
+    # Parity juga untuk DataFrame dengan index non-default (hasil filter / sort):
+    # index pemanggil dipertahankan, sama dengan baseline untuk input flat
+    df = synthetic_frame(1_000, seed=1)
+    df = df.iloc[::-2].set_axis(np.arange(len(df.iloc[::-2])) * 3 + 7)
+    pd.testing.assert_frame_equal(preprocess_data(df.copy()), preprocess_data_legacy(df.copy()))
+    print("non-default index: identical")
+
+    print(f"{'rows':>10} {'legacy_s':>9} {'vector_s':>9} {'speedup':>8} {'legacy_mb':>10} {'vector_mb':>10} identical")
+    for rows in args.rows:
+        df = synthetic_frame(rows)
+        vectorized, vector_s, vector_mb = timed(preprocess_data, df)
+        if rows <= args.max_legacy_rows:
+            legacy, legacy_s, legacy_mb = timed(preprocess_data_legacy, df)
+            pd.testing.assert_frame_equal(vectorized, legacy)
+            print(
+                f"{rows:>10} {legacy_s:>9.2f} {vector_s:>9.2f} {legacy_s / vector_s:>7.1f}x "
+                f"{legacy_mb:>10.0f} {vector_mb:>10.0f} yes"
+            )
+        else:
+            print(f"{rows:>10} {'-':>9} {vector_s:>9.2f} {'-':>8} {'-':>10} {vector_mb:>10.0f} -")
+
+
+if __name__ == "__main__":
+    main()
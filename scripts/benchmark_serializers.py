@@ -0,0 +1,80 @@
+"""
+Benchmark serializer JSON untuk response API: stdlib json vs orjson (jika terinstall).
+Payload dibuat dari item trending sintetis -> process_video_data -> transform_mongo_doc,
+jadi bentuknya sama persis dengan response /top-videos dan /predict/batch.
+
+Usage:
+    python scripts/benchmark_serializers.py [--videos 10 100 1000] [--repeat 200]
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+import numpy as np
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(SCRIPTS_DIR), "api"))
+sys.path.insert(0, SCRIPTS_DIR)
+
+from benchmark_ingest import fake_item
+from function_app import process_video_data, build_top_videos_payload, format_prediction
+from shared.serializer import SERIALIZERS, SERIALIZER_NAME
+
+
+def build_payloads(n_videos):
+    """Payload /top-videos (dokumen hasil transform_mongo_doc) dan payload batch predict"""
+    docs = [process_video_data(fake_item()) for _ in range(n_videos)]
+    top_videos, _ = build_top_videos_payload(docs)
+    # Baris probabilitas realistis (jumlah 1) untuk kelas LabelEncoder, urut seperti classes_
+    class_labels = np.array(["rendah", "sedang", "tinggi"], dtype=object)
+    probability_matrix = np.random.default_rng(0).dirichlet([2.0, 3.0, 1.5], n_videos)
+    labels = class_labels[probability_matrix.argmax(axis=1)]
+    results = []
+    for index in range(n_videos):
+        result = format_prediction(labels[index], probability_matrix[index], class_labels)
+        result["index"] = index
+        results.append(result)
+    batch = {
+        "results": results,
+        "count": n_videos,
+        "success_count": n_videos,
+        "error_count": 0,
+        "model_version": "benchmark",
+    }
+    return {"top-videos": top_videos, "predict-batch": batch}
+
+
+def time_serializer(dumps, payload, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = dumps(payload)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e6, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--videos", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"Active serializer: {SERIALIZER_NAME}")
+    print(f"{'payload':<14} {'videos':>7} {'serializer':<10} {'p50_us':>10} {'bytes':>9} {'speedup':>8}")
+    for n_videos in args.videos:
+        for payload_name, payload in build_payloads(n_videos).items():
+            baseline = None
+            for name, dumps in SERIALIZERS.items():
+                p50, size = time_serializer(dumps, payload, args.repeat)
+                baseline = baseline or p50
+                print(
+                    f"{payload_name:<14} {n_videos:>7} {name:<10} {p50:>10.1f} "
+                    f"{size:>9} {baseline / p50:>7.1f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
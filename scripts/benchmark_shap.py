@@ -0,0 +1,121 @@
+"""
+Benchmark overhead SHAP di jalur request /predict (single row).
+Membandingkan p50/p99 latency:
+  - predict        : score_feature_matrix saja (tanpa penjelasan)
+  - predict+contrib: + TreeSHAP native LightGBM (pred_contrib) + format_explanation
+  - memoized       : cache hit LRUCache (feature vector sama diminta ulang)
+  - shap.Explainer : shap.TreeExplainer.shap_values (jika package shap terinstall)
+
+Usage:
+    python scripts/benchmark_shap.py [--requests 2000] [--unique 200]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api")
+)
+from shared.model_loader import model_loader
+from shared.cache import LRUCache
+from shared.explain import compute_contributions, format_explanation
+from function_app import score_feature_matrix, format_prediction
+
+
+def random_rows(n, n_music, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.integers(5, 180, n),
+        rng.integers(0, 15, n),
+        rng.integers(0, 24, n),
+        rng.integers(0, 7, n),
+        rng.integers(1, 13, n),
+        rng.integers(0, max(n_music, 1), n),
+    ]).astype(np.float64)
+
+
+def percentiles(samples):
+    samples = np.asarray(samples) * 1e3
+    return np.percentile(samples, 50), np.percentile(samples, 99)
+
+
+def run(label, fn, rows):
+    samples = []
+    for row in rows:
+        start = time.perf_counter()
+        fn(row.reshape(1, -1))
+        samples.append(time.perf_counter() - start)
+    return label, *percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--unique", type=int, default=200,
+                        help="jumlah feature vector unik (sisanya pengulangan -> cache hit)")
+    args = parser.parse_args()
+
+    model = model_loader.get_model()
+    label_encoder = model_loader.get_label_encoder()
+    n_music = len(model_loader.get_music_encoder().classes_)
+    unique_rows = random_rows(args.unique, n_music)
+    rows = unique_rows[np.random.default_rng(1).integers(0, args.unique, args.requests)]
+
+    def predict(x):
+        labels, proba = score_feature_matrix(model, label_encoder, x)
+        return format_prediction(labels[0], proba[0], label_encoder.classes_)
+
+    def predict_explained(x):
+        result = predict(x)
+        contributions = compute_contributions(model, x)
+        format_explanation(
+            contributions[0], int(np.argmax([p["score"] for p in result["probabilities"]])),
+            x[0], result["prediction"],
+        )
+        return result
+
+    cache = LRUCache(maxsize=4096)
+
+    def memoized(x):
+        key = tuple(x[0].tolist())
+        result = cache.get(key)
+        if result is None:
+            result = predict_explained(x)
+            cache.set(key, result)
+        return result
+
+    # Warm-up (lazy init LightGBM / sklearn)
+    predict_explained(rows[:1])
+
+    results = [
+        run("predict", predict, rows),
+        run("predict+contrib", predict_explained, rows),
+        run("memoized", memoized, rows),
+    ]
+
+    try:
+        import shap
+
+        explainer = shap.TreeExplainer(model)
+        results.append(run(
+            "shap.Explainer", lambda x: (predict(x), explainer.shap_values(x)), rows[:200]
+        ))
+    except ImportError:
+        pass
+
+    baseline_p50, baseline_p99 = results[0][1], results[0][2]
+    print(f"{'variant':<16} {'p50_ms':>8} {'p99_ms':>8} {'+p50_ms':>8} {'+p99_ms':>8}")
+    for label, p50, p99 in results:
+        print(
+            f"{label:<16} {p50:>8.3f} {p99:>8.3f} "
+            f"{p50 - baseline_p50:>+8.3f} {p99 - baseline_p99:>+8.3f}"
+        )
+    print(f"memoized cache: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark inference LightGBM: sklearn predict_proba vs Booster.predict vs
+CompiledTreeEnsemble (array NumPy, api/shared/tree_engine.py).
+Mengukur latency single-row (p50/p99) dan batch, plus parity max |diff| probabilitas.
+
+Usage:
+    python scripts/benchmark_tree_engine.py [--single 1000] [--batch 1 100 1000 10000]
+"""
+
+import os
+import sys
+import time
+import argparse
+import warnings
+
+import numpy as np
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api")
+)
+from shared.model_loader import model_loader
+from shared.tree_engine import compile_model, parity_sample
+
+
+def latency_ms(fn, x, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(x)
+        samples.append(time.perf_counter() - start)
+    samples = np.asarray(samples) * 1e3
+    return np.percentile(samples, 50), np.percentile(samples, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--single", type=int, default=1000, help="jumlah request single-row")
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 100, 1000, 10000])
+    args = parser.parse_args()
+
+    # Nama fitur DataFrame vs ndarray tidak relevan untuk benchmark
+    warnings.filterwarnings("ignore")
+    model = model_loader.get_model()
+    booster = model.booster_
+
+    start = time.perf_counter()
+    compiled = compile_model(model, sample=parity_sample(model))
+    compile_seconds = time.perf_counter() - start
+    print(
+        f"trees={compiled.n_trees} classes={compiled.num_class} max_depth={compiled.max_depth} "
+        f"nodes={len(compiled.feature)} compile={compile_seconds:.3f}s"
+    )
+
+    engines = {
+        "sklearn": model.predict_proba,
+        "booster": booster.predict,
+        "compiled": compiled.predict_proba,
+    }
+
+    sample = parity_sample(model, n_rows=max(args.batch), seed=1)
+    expected = model.predict_proba(sample)
+    parity = float(np.max(np.abs(compiled.predict_proba(sample) - expected)))
+    print(f"parity max |diff| vs predict_proba: {parity:.3g}")
+
+    print(f"\n{'engine':<10} {'single_p50_ms':>14} {'single_p99_ms':>14}")
+    single = sample[:1]
+    for name, fn in engines.items():
+        fn(single)  # warm-up
+        p50, p99 = latency_ms(fn, single, args.single)
+        print(f"{name:<10} {p50:>14.3f} {p99:>14.3f}")
+
+    print(f"\n{'engine':<10} {'rows':>7} {'ms':>10} {'rows/s':>12}")
+    for rows in args.batch:
+        batch = sample[:rows]
+        for name, fn in engines.items():
+            repeat = max(3, min(100, 20000 // rows))
+            p50, _ = latency_ms(fn, batch, repeat)
+            print(f"{name:<10} {rows:>7} {p50:>10.3f} {rows / (p50 / 1e3):>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
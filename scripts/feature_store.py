@@ -0,0 +1,148 @@
+"""
+Feature store lokal untuk training: snapshot fitur hasil preprocess_data (Arrow IPC /
+Feather v2 tanpa kompresi, dibaca memory-mapped) + watermark fetched_at.
+
+Setiap run hanya mengambil dokumen historical_data dengan fetched_at >= watermark
+(fetched_at terbesar yang terbaca dikurangi FEATURE_STORE_WATERMARK_LAG),
+mem-preprocess delta itu saja, lalu merge ke snapshot berdasarkan video_id (baris lama
+untuk video yang di-upsert ulang diganti). Biaya retrain jadi sebanding dengan data baru,
+bukan total history. Dokumen yang dihapus dari MongoDB tidak ikut terhapus dari snapshot;
+pakai rebuild=True (FEATURE_STORE_REBUILD=1) untuk membangun ulang dari nol.
+"""
+
+import os
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from training_loader import load_training_frame
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - tanpa pyarrow: full load tiap run
+    pa = None
+    feather = None
+
+
+FEATURE_STORE_FILE = "training_features.arrow"
+FEATURE_STORE_META_FILE = "training_features.json"
+
+# Watermark disimpan mundur sebesar lag ini: ingest menulis bulk_write unordered dan
+# fetched_at di-set saat transform, jadi dokumen dengan fetched_at lebih kecil bisa baru
+# terlihat setelah dokumen yang lebih baru. Overlap dibaca ulang, duplikat dibuang merge video_id.
+FEATURE_STORE_WATERMARK_LAG = timedelta(
+    minutes=int(os.environ.get("FEATURE_STORE_WATERMARK_LAG_MINUTES", "60"))
+)
+
+# Naikkan jika preprocess_data / kolom fitur berubah -> snapshot lama otomatis di-rebuild
+FEATURE_STORE_SCHEMA_VERSION = 1
+
+FEATURE_STORE_COLUMNS = [
+    "video_id",
+    "video_duration",
+    "hashtags_count",
+    "upload_hour",
+    "upload_day",
+    "upload_month",
+    "music_title",
+    "engagement_rate",
+    "engagement_label",
+]
+
+
+def read_feature_store_meta(store_dir):
+    """Return metadata snapshot (watermark, rows, schema_version), atau None jika belum ada"""
+    meta_path = os.path.join(store_dir, FEATURE_STORE_META_FILE)
+    data_path = os.path.join(store_dir, FEATURE_STORE_FILE)
+    if not (os.path.exists(meta_path) and os.path.exists(data_path)):
+        return None
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("schema_version") != FEATURE_STORE_SCHEMA_VERSION:
+        return None
+    return meta
+
+
+def read_feature_store(store_dir):
+    """Baca snapshot secara memory-mapped (tanpa decode/dekompresi) ke DataFrame"""
+    table = feather.read_table(os.path.join(store_dir, FEATURE_STORE_FILE), memory_map=True)
+    return table.to_pandas()
+
+
+def write_feature_store(store_dir, df, watermark):
+    """Tulis snapshot + metadata secara atomic (tmp lalu os.replace, data dulu baru meta)"""
+    os.makedirs(store_dir, exist_ok=True)
+    data_path = os.path.join(store_dir, FEATURE_STORE_FILE)
+    meta_path = os.path.join(store_dir, FEATURE_STORE_META_FILE)
+
+    table = pa.Table.from_pandas(df[FEATURE_STORE_COLUMNS], preserve_index=False)
+    feather.write_feather(table, f"{data_path}.tmp", compression="uncompressed")
+    os.replace(f"{data_path}.tmp", data_path)
+
+    meta = {
+        "schema_version": FEATURE_STORE_SCHEMA_VERSION,
+        "watermark": watermark.isoformat() if watermark is not None else None,
+        "rows": int(len(df)),
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }
+    with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(f"{meta_path}.tmp", meta_path)
+    return meta
+
+
+def merge_features(snapshot, delta, delta_video_ids):
+    """
+    Upsert by video_id: buang baris snapshot untuk video yang ada di delta mentah
+    (termasuk yang di-drop preprocess), lalu tambahkan fitur delta.
+    """
+    # historical_data: satu dokumen per video (_id = video id), jadi delta sudah unik
+    stale = snapshot["video_id"].isin(pd.Series(delta_video_ids).dropna())
+    return pd.concat([snapshot[~stale], delta], ignore_index=True)
+
+
+def sync_feature_store(collection, store_dir, preprocess, partitions=4, batch_size=5000, rebuild=False):
+    """
+    Update snapshot dengan dokumen baru sejak watermark lalu return seluruh fitur training.
+    `preprocess`: fungsi preprocess_data dari train_model.py (per baris, jadi aman
+    dijalankan hanya pada delta). Returns (DataFrame fitur, report)
+    """
+    start_time = time.perf_counter()
+    meta = None if (rebuild or pa is None) else read_feature_store_meta(store_dir)
+    since = datetime.fromisoformat(meta["watermark"]) if meta and meta.get("watermark") else None
+    if meta is not None and since is None:
+        meta = None  # snapshot tanpa watermark tidak bisa di-update incremental
+
+    raw, load_report = load_training_frame(collection, partitions=partitions, batch_size=batch_size, since=since)
+    delta_video_ids = raw["video_id"].to_numpy()
+    delta = preprocess(raw)[FEATURE_STORE_COLUMNS] if len(raw) else None
+
+    if meta is None:
+        features = delta if delta is not None else pd.DataFrame(columns=FEATURE_STORE_COLUMNS)
+    else:
+        snapshot = read_feature_store(store_dir)
+        features = merge_features(snapshot, delta, delta_video_ids) if delta is not None else snapshot
+
+    if load_report["watermark"] is not None:
+        watermark = load_report["watermark"] - FEATURE_STORE_WATERMARK_LAG
+        if since is not None:
+            watermark = max(watermark, since)
+    else:
+        watermark = since
+    if pa is not None and (delta is not None or meta is None):
+        write_feature_store(store_dir, features, watermark)
+
+    report = {
+        "mode": "disabled" if pa is None else ("full" if meta is None else "incremental"),
+        "since": since.isoformat() if since else None,
+        "watermark": watermark.isoformat() if watermark is not None else None,
+        "new_rows": int(len(raw)),
+        "rows": int(len(features)),
+        "load_seconds": load_report["seconds"],
+        "seconds": round(time.perf_counter() - start_time, 3),
+        "loader": load_report,
+    }
+    return features.reset_index(drop=True), report
@@ -1,19 +1,42 @@
 import os
+import argparse
+import time
 import pandas as pd
 import numpy as np
 import joblib
-import re
 import shap
 from pymongo import MongoClient
 from sklearn.preprocessing import LabelEncoder
 from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report
-from lightgbm import LGBMClassifier
+from sklearn.metrics import classification_report, accuracy_score, f1_score
+from lightgbm import LGBMClassifier, early_stopping
 from datetime import datetime
+import sys
+
+# Pakai helper artifact yang sama dengan API (api/shared)
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api")
+)
+from shared.native_model import (
+    export_native_artifacts,
+    NATIVE_MODEL_FILE,
+    NATIVE_ENCODERS_FILE,
+    LITE_PICKLE_MODEL_FILE,
+    LITE_NATIVE_MODEL_FILE,
+)
+from shared.model_bundle import write_model_manifest
+
+# Feature store + loader columnar (scripts/feature_store.py, scripts/training_loader.py)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from feature_store import sync_feature_store
 
 
 # --- 1. KONEKSI DATABASE ---
-def get_data_from_mongo():
+def get_training_features():
+    """
+    Fitur training via feature store lokal (scripts/feature_store.py): hanya dokumen
+    dengan fetched_at >= watermark snapshot yang di-download & di-preprocess.
+    """
     print("🔌 Menghubungkan ke MongoDB...")
     connection_string = os.environ.get("MONGODB_CONNECTION_STRING")
     if not connection_string:
@@ -21,30 +44,61 @@ def get_data_from_mongo():
             "Environment variable MONGODB_CONNECTION_STRING tidak ditemukan!"
         )
 
-    with MongoClient(connection_string) as client:
-        db = client["b4upload_db"]
-        collection = db["historical_data"]
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    store_dir = os.environ.get("FEATURE_STORE_DIR", os.path.join(project_root, ".feature_store"))
 
-        # Ambil semua data
-        data = list(collection.find({}, {"_id": 0}))
-        print(f"📦 Berhasil mengambil {len(data)} data dari MongoDB.")
-        return pd.DataFrame(data)
+    with MongoClient(connection_string) as client:
+        collection = client["b4upload_db"]["historical_data"]
+        df, report = sync_feature_store(
+            collection,
+            store_dir,
+            preprocess_data,
+            partitions=int(os.environ.get("TRAIN_LOADER_PARTITIONS", "4")),
+            batch_size=int(os.environ.get("TRAIN_LOADER_BATCH_SIZE", "5000")),
+            rebuild=os.environ.get("FEATURE_STORE_REBUILD", "0") == "1",
+        )
+    print(
+        f"🗃️  Feature store ({report['mode']}): +{report['new_rows']} dokumen baru sejak "
+        f"{report['since'] or 'awal'}, total {report['rows']} baris, watermark {report['watermark']}, "
+        f"{report['seconds']}s (download {report['load_seconds']}s)"
+    )
+    loader = report["loader"]
+    print(
+        f"⏱️  Loader: {loader['rows_per_second']} rows/s, {loader['partitions']} partisi, "
+        f"{loader['chunks']} chunk, kolom {loader['column_mb']} MB, "
+        f"peak RSS +{loader['peak_rss_delta_mb']} MB"
+    )
+    return df
 
 
 # --- 2. PREPROCESSING ---
-def extract_hashtags_count(text):
-    if not isinstance(text, str):
-        return 0
-    return len(re.findall(r"#\w+", text))
+HASHTAG_PATTERN = r"#\w+"
+
+# Batas engagement rate untuk label (rate < batas -> label)
+ENGAGEMENT_LABEL_BINS = [(0.02, "rendah"), (0.06, "sedang")]
+ENGAGEMENT_LABEL_DEFAULT = "tinggi"
+
+
+def count_hashtags(descriptions):
+    """Versi vectorized extract_hashtags_count untuk satu kolom (non-string -> 0)"""
+    # Non-string (None/NaN/angka) di-mask dulu: kolom tanpa string tetap valid untuk .str
+    strings = descriptions.where(descriptions.map(lambda v: isinstance(v, str)))
+    return strings.astype("string").str.count(HASHTAG_PATTERN).fillna(0).astype("int64")
+
+
+def label_engagement(rates):
+    """Label engagement per baris tanpa apply (np.select atas seluruh kolom)"""
+    rates = np.asarray(rates, dtype=np.float64)
+    conditions = [rates < limit for limit, _ in ENGAGEMENT_LABEL_BINS]
+    choices = np.array([label for _, label in ENGAGEMENT_LABEL_BINS], dtype=object)
+    return np.select(conditions, choices, default=ENGAGEMENT_LABEL_DEFAULT)
 
 
 def preprocess_data(df):
     print("🧹 Memulai Preprocessing...")
 
-    # A. Flatten Stats
-    if "stats" in df.columns and not df.empty and isinstance(df.iloc[0]["stats"], dict):
-        stats_df = pd.json_normalize(df["stats"])
-        df = pd.concat([df.drop(["stats"], axis=1), stats_df], axis=1)
+    # A. Stats sudah flat (play_count, digg_count, ...): TRAINING_PROJECTION di
+    # training_loader mem-flatten stats di server, jadi tidak ada kolom dict "stats"
 
     # B. Target Engineering
     cols_to_numeric = [
@@ -70,20 +124,12 @@ def preprocess_data(df):
     df.dropna(subset=["engagement_rate"], inplace=True)
 
     # C. Labeling
-    def label_eng(rate):
-        if rate < 0.02:
-            return "rendah"
-        elif rate < 0.06:
-            return "sedang"
-        else:
-            return "tinggi"
-
-    df["engagement_label"] = df["engagement_rate"].apply(label_eng)
+    df["engagement_label"] = label_engagement(df["engagement_rate"].to_numpy())
 
     # D. Feature Extraction: Hashtags
     if "hashtags_count" not in df.columns:
         if "description" in df.columns:
-            df["hashtags_count"] = df["description"].apply(extract_hashtags_count)
+            df["hashtags_count"] = count_hashtags(df["description"])
         else:
             df["hashtags_count"] = 0
 
@@ -105,19 +151,96 @@ def preprocess_data(df):
     return df
 
 
+# --- 2b. SERVING VARIANT (LITE) ---
+# Validation split internal untuk early stopping lite
+LITE_VALIDATION_SIZE = 0.15
+
+
+def can_validate_lite(y_train):
+    """
+    True jika y_train cukup untuk stratified validation split: setiap kelas punya
+    minimal 2 sampel dan validation set cukup besar untuk memuat semua kelas
+    """
+    counts = np.unique(y_train, return_counts=True)[1]
+    return counts.min() >= 2 and int(len(y_train) * LITE_VALIDATION_SIZE) >= len(counts)
+
+
+def train_lite_model(X_train, y_train, min_child):
+    """
+    Latih varian serving ringan: early stopping pada validation split internal
+    (jumlah tree = best iteration) dan num_leaves lebih kecil. Binning fitur sama
+    dengan model full (default LightGBM).
+    """
+    lite = LGBMClassifier(
+        n_estimators=500,
+        learning_rate=0.1,
+        num_leaves=15,
+        subsample=0.8,
+        subsample_freq=1,
+        colsample_bytree=0.8,
+        min_child_samples=min_child,
+        random_state=42,
+        verbose=-1,
+    )
+    if not can_validate_lite(y_train):
+        # Data terlalu sedikit untuk validation split - latih tanpa early stopping
+        print("⚠️  Data terlalu sedikit untuk early stopping, melatih lite tanpa validation.")
+        lite.set_params(n_estimators=100)
+        lite.fit(X_train, y_train)
+        return lite
+
+    X_fit, X_val, y_fit, y_val = train_test_split(
+        X_train, y_train, test_size=LITE_VALIDATION_SIZE, random_state=42, stratify=y_train
+    )
+    lite.fit(
+        X_fit,
+        y_fit,
+        eval_set=[(X_val, y_val)],
+        callbacks=[early_stopping(30, verbose=False)],
+    )
+    return lite
+
+
+# Field hasil evaluate_variant yang bergantung pada wall-clock (tidak masuk artifact)
+VARIANT_TIMING_FIELDS = ("single_row_p50_ms", "single_row_p99_ms")
+
+
+def evaluate_variant(name, model, X_test, y_test, repeat=200):
+    """Akurasi vs latency single-row (Booster.predict) & ukuran model satu varian"""
+    y_pred = model.predict(X_test)
+    row = np.asarray(X_test, dtype=np.float64)[:1]
+    booster = model.booster_
+    booster.predict(row)  # warm-up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        booster.predict(row)
+        samples.append(time.perf_counter() - start)
+    # Prediksi & model_to_string memakai best_iteration (jika ada early stopping), jadi
+    # jumlah tree juga dihitung sampai best_iteration, bukan termasuk tree patience
+    iterations = booster.best_iteration if booster.best_iteration > 0 else booster.current_iteration()
+    return {
+        "variant": name,
+        "n_trees": int(iterations * booster.num_model_per_iteration()),
+        "best_iteration": int(iterations),
+        "accuracy": round(float(accuracy_score(y_test, y_pred)), 4),
+        "macro_f1": round(float(f1_score(y_test, y_pred, average="macro", zero_division=0)), 4),
+        "single_row_p50_ms": round(float(np.percentile(samples, 50) * 1e3), 4),
+        "single_row_p99_ms": round(float(np.percentile(samples, 99) * 1e3), 4),
+        "model_kb": round(len(booster.model_to_string()) / 1024, 1),
+    }
+
+
 # --- 3. TRAINING PIPELINE ---
 def train():
-    # 1. Load Data
-    df = get_data_from_mongo()
+    # 1. Load Data (sudah di-preprocess, incremental lewat feature store lokal)
+    df = get_training_features()
 
     if len(df) < 10:
         print(
             "⚠️  WARNING: Data terlalu sedikit (< 10 baris). Hasil mungkin tidak akurat."
         )
 
-    # 2. Preprocess
-    df = preprocess_data(df)
-
     # 3. Define Features & Target
     feature_cols = [
         "video_duration",
@@ -193,6 +316,20 @@ def train():
         print(f"⚠️  Gagal mencetak report detail: {e}")
         print(f"Akurasi kasar: {np.mean(y_test == y_pred):.2f}")
 
+    # 8b. Serving variant ringan + catat tradeoff akurasi vs latency
+    print("🪶 Melatih serving variant (lite)...")
+    lite_model = train_lite_model(X_train, y_train, min_child)
+    variants = [
+        evaluate_variant("full", model, X_test, y_test),
+        evaluate_variant("lite", lite_model, X_test, y_test),
+    ]
+    print(f"{'variant':<6} {'trees':>6} {'acc':>7} {'f1':>7} {'p50_ms':>8} {'p99_ms':>8} {'kb':>8}")
+    for v in variants:
+        print(
+            f"{v['variant']:<6} {v['n_trees']:>6} {v['accuracy']:>7.4f} {v['macro_f1']:>7.4f} "
+            f"{v['single_row_p50_ms']:>8.4f} {v['single_row_p99_ms']:>8.4f} {v['model_kb']:>8.1f}"
+        )
+
     # 9. SHAP
     print("🧠 Membuat SHAP Explainer...")
     explainer = shap.TreeExplainer(model)
@@ -214,12 +351,54 @@ def train():
     joblib.dump(music_encoder, os.path.join(models_dir, "music_encoder.pkl"))
     joblib.dump(explainer, os.path.join(models_dir, "shap_explainer.pkl"))
 
+    # Format native (LightGBM text + vocabulary JSON) untuk cold-start yang lebih cepat
+    print("💾 Menyimpan artifact format native...")
+    export_native_artifacts(model, label_encoder, music_encoder, models_dir)
+
+    # Serving variant lite (encoders sama dengan model full)
+    joblib.dump(lite_model, os.path.join(models_dir, LITE_PICKLE_MODEL_FILE))
+    lite_model.booster_.save_model(os.path.join(models_dir, LITE_NATIVE_MODEL_FILE))
+
+    # Manifest ditulis terakhir: versi bundle + hash artifact (dipakai hot reload di API)
+    manifest = write_model_manifest(
+        models_dir,
+        [
+            "b4upload_model.pkl",
+            "label_encoder.pkl",
+            "music_encoder.pkl",
+            NATIVE_MODEL_FILE,
+            NATIVE_ENCODERS_FILE,
+            LITE_PICKLE_MODEL_FILE,
+            LITE_NATIVE_MODEL_FILE,
+        ],
+        # Hanya data deterministik: latency berubah tiap run dan hanya di-log di atas,
+        # supaya manifest (dan commit CI) tidak berubah jika artifact identik
+        extra={
+            "training_rows": int(len(X_train)),
+            "serving_variants": [
+                {key: value for key, value in v.items() if key not in VARIANT_TIMING_FIELDS}
+                for v in variants
+            ],
+        },
+    )
+    print(f"🏷️  Model bundle version: {manifest['version']}")
+
     print("✅ Training Selesai & Artifacts tersimpan!")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train model B4Upload")
+    parser.add_argument(
+        "--sync-features-only",
+        action="store_true",
+        help="hanya update feature store lokal (tanpa training), dipakai job refresh cache CI",
+    )
+    args = parser.parse_args()
     try:
-        train()
+        if args.sync_features_only:
+            get_training_features()
+        else:
+            train()
         print("🎉 Program selesai dijalankan dengan sukses!")
     except Exception as e:
         print(f"❌ Terjadi error fatal: {e}")
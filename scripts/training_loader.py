@@ -0,0 +1,189 @@
+"""
+Loader data training dari MongoDB historical_data ke kolom NumPy (columnar).
+
+Hanya field yang dipakai fitur/target yang diambil (projection di server), dibaca
+per chunk `batch_size` dokumen, dan bisa dijalankan paralel sebagai beberapa cursor
+yang masing-masing membaca satu rentang fetched_at. Tidak ada list of dicts untuk
+seluruh collection, jadi peak memory ~ ukuran kolom hasil + satu chunk per cursor.
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Helper memory yang sama dengan API (api/shared)
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api")
+)
+from shared.memory import peak_rss_mb
+
+
+NUMERIC_COLUMNS = [
+    "play_count",
+    "digg_count",
+    "comment_count",
+    "share_count",
+    "video_duration",
+    "hashtags_count",
+    "create_time",
+]
+TEXT_COLUMNS = ["music_title", "video_id"]
+
+# Projection server-side: stats di-flatten, hashtags_count dihitung dari description
+# hanya untuk dokumen lama yang belum menyimpan hashtags_count
+TRAINING_PROJECTION = {
+    "_id": 0,
+    "video_id": 1,
+    "play_count": "$stats.play_count",
+    "digg_count": "$stats.digg_count",
+    "comment_count": "$stats.comment_count",
+    "share_count": "$stats.share_count",
+    "video_duration": 1,
+    "create_time": 1,
+    "music_title": 1,
+    "hashtags_count": {
+        "$ifNull": [
+            "$hashtags_count",
+            {
+                "$cond": [
+                    {"$eq": [{"$type": "$description"}, "string"]},
+                    {"$size": {"$regexFindAll": {"input": "$description", "regex": r"#\w+"}}},
+                    0,
+                ]
+            },
+        ]
+    },
+}
+
+
+def _to_float(value):
+    """Nilai Mongo -> float seperti pd.to_numeric(errors="coerce"); invalid -> NaN"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return np.nan
+    return np.nan
+
+
+class ColumnBuffer:
+    """Kumpulkan dokumen per chunk lalu bekukan jadi array NumPy per kolom"""
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.chunks = {column: [] for column in NUMERIC_COLUMNS + TEXT_COLUMNS}
+        self._pending = {column: [] for column in self.chunks}
+        self.rows = 0
+        self.chunk_count = 0
+
+    def append(self, doc):
+        for column in NUMERIC_COLUMNS:
+            self._pending[column].append(_to_float(doc.get(column)))
+        for column in TEXT_COLUMNS:
+            self._pending[column].append(doc.get(column, np.nan))
+        if len(self._pending["play_count"]) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        size = len(self._pending["play_count"])
+        if not size:
+            return
+        for column in NUMERIC_COLUMNS:
+            self.chunks[column].append(np.asarray(self._pending[column], dtype=np.float64))
+        for column in TEXT_COLUMNS:
+            self.chunks[column].append(np.asarray(self._pending[column], dtype=object))
+        self._pending = {column: [] for column in self.chunks}
+        self.rows += size
+        self.chunk_count += 1
+
+    def columns(self):
+        self.flush()
+        result = {}
+        for column, chunks in self.chunks.items():
+            dtype = object if column in TEXT_COLUMNS else np.float64
+            result[column] = np.concatenate(chunks) if chunks else np.empty(0, dtype=dtype)
+        return result
+
+
+def read_partition(collection, match, batch_size):
+    """Baca satu partisi (filter `match`) per chunk. Returns (columns, rows, chunks)"""
+    pipeline = [{"$match": match}, {"$project": TRAINING_PROJECTION}]
+    buffer = ColumnBuffer(batch_size)
+    for doc in collection.aggregate(pipeline, batchSize=batch_size, allowDiskUse=True):
+        buffer.append(doc)
+    columns = buffer.columns()
+    return columns, buffer.rows, buffer.chunk_count
+
+
+def fetched_at_partitions(collection, partitions, since=None):
+    """
+    Bagi collection jadi `partitions` rentang fetched_at yang sama panjang (min/max
+    diambil lewat index fetched_at), plus satu partisi untuk dokumen tanpa fetched_at.
+    Jika `since` diisi, hanya dokumen dengan fetched_at >= since (tanpa partisi sisa).
+    Returns (list filter $match, watermark = fetched_at terbesar yang tercakup)
+    """
+    dated = {"$type": "date"} if since is None else {"$type": "date", "$gte": since}
+    first = collection.find_one({"fetched_at": dated}, {"fetched_at": 1}, sort=[("fetched_at", 1)])
+    last = collection.find_one({"fetched_at": dated}, {"fetched_at": 1}, sort=[("fetched_at", -1)])
+    leftover = [{"fetched_at": {"$not": {"$type": "date"}}}] if since is None else []
+    if first is None or last is None:
+        return ([{}] if since is None else []), since
+
+    start, end = first["fetched_at"], last["fetched_at"]
+    partitions = max(1, partitions)
+    step = (end - start) / partitions
+    if partitions == 1 or step.total_seconds() <= 0:
+        return [{"fetched_at": {"$gte": start, "$lte": end}}] + leftover, end
+
+    bounds = [start + step * i for i in range(partitions)] + [end]
+    matches = []
+    for i in range(partitions):
+        upper = "$lte" if i == partitions - 1 else "$lt"
+        matches.append({"fetched_at": {"$gte": bounds[i], upper: bounds[i + 1]}})
+    return matches + leftover, end
+
+
+def load_training_frame(collection, partitions=4, batch_size=5000, since=None):
+    """
+    Load kolom training dari historical_data secara chunked (dan paralel per partisi).
+    `since`: hanya dokumen dengan fetched_at >= since (load incremental).
+    Returns (DataFrame berkolom flat untuk preprocess_data, report waktu & memory)
+    """
+    start_time = time.perf_counter()
+    start_rss = peak_rss_mb()
+
+    matches, watermark = fetched_at_partitions(collection, partitions, since=since)
+    results = []
+    if matches:
+        with ThreadPoolExecutor(max_workers=len(matches)) as executor:
+            results = list(executor.map(lambda match: read_partition(collection, match, batch_size), matches))
+
+    columns = {
+        column: np.concatenate(
+            [result[0][column] for result in results]
+            or [np.empty(0, dtype=object if column in TEXT_COLUMNS else np.float64)]
+        )
+        for column in NUMERIC_COLUMNS + TEXT_COLUMNS
+    }
+    df = pd.DataFrame(columns)
+    # create_time tetap integer detik jika lengkap (sama dengan dokumen aslinya)
+    if len(df) and not np.isnan(columns["create_time"]).any():
+        df["create_time"] = columns["create_time"].astype(np.int64)
+
+    report = {
+        "rows": int(len(df)),
+        "partitions": len(matches),
+        "chunks": int(sum(result[2] for result in results)),
+        "seconds": round(time.perf_counter() - start_time, 3),
+        "column_mb": round(sum(array.nbytes for array in columns.values()) / 2**20, 2),
+        "peak_rss_delta_mb": round(peak_rss_mb() - start_rss, 2),
+        "watermark": watermark,
+    }
+    report["rows_per_second"] = round(report["rows"] / report["seconds"], 1) if report["seconds"] else 0.0
+    return df, report